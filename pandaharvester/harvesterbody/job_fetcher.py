@@ -68,7 +68,8 @@ class JobFetcher(AgentBase):
                     else:
                         extractorCore = None
                     jobSpecs = []
-                    fileStatMap = dict()
+                    fileGroupDictListPerJob = []
+                    lfnsToCheck = set()
                     sw_startconvert = core_utils.get_stopwatch()
                     for job in jobs:
                         timeNow = datetime.datetime.utcnow()
@@ -87,13 +88,18 @@ class JobFetcher(AgentBase):
                         fileGroupDictList = [jobSpec.get_input_file_attributes()]
                         if extractorCore is not None:
                             fileGroupDictList.append(extractorCore.get_aux_inputs(jobSpec))
+                        for fileGroupDict in fileGroupDictList:
+                            lfnsToCheck.update(fileGroupDict)
+                        jobSpecs.append(jobSpec)
+                        fileGroupDictListPerJob.append(fileGroupDictList)
+                    # check file status
+                    fileStatMap = self.dbProxy.get_file_status_bulk(lfnsToCheck, 'input',
+                                                                    queueConfig.ddmEndpointIn,
+                                                                    'starting')
+                    for jobSpec, fileGroupDictList in zip(jobSpecs, fileGroupDictListPerJob):
                         for fileGroupDict in fileGroupDictList:
                             for tmpLFN, fileAttrs in iteritems(fileGroupDict):
-                                # check file status
-                                if tmpLFN not in fileStatMap:
-                                    fileStatMap[tmpLFN] = self.dbProxy.get_file_status(tmpLFN, 'input',
-                                                                                       queueConfig.ddmEndpointIn,
-                                                                                       'starting')
+                                fileStatMap.setdefault(tmpLFN, dict())
                                 # make file spec
                                 fileSpec = FileSpec()
                                 fileSpec.PandaID = jobSpec.PandaID
@@ -119,12 +125,16 @@ class JobFetcher(AgentBase):
                                     fileSpec.url = fileAttrs['INTERNAL_URL']
                                 jobSpec.add_in_file(fileSpec)
                         jobSpec.trigger_propagation()
-                        jobSpecs.append(jobSpec)
                     # insert to DB
                     tmpLog.debug("Converting of {0} jobs {1}".format(len(jobs),sw_startconvert.get_elapsed_time()))
                     sw_insertdb =core_utils.get_stopwatch()
-                    self.dbProxy.insert_jobs(jobSpecs)
-                    tmpLog.debug('Insert of {0} jobs {1}'.format(len(jobSpecs), sw_insertdb.get_elapsed_time()))
+                    self.dbProxy.insert_jobs(jobSpecs,
+                                             bulk_mode=getattr(harvester_config.jobfetcher, 'bulkInsert', False),
+                                             use_upsert=getattr(harvester_config.jobfetcher, 'useUpsert', False))
+                    insertTime = sw_insertdb.get_elapsed_time_in_sec(precise=True)
+                    tmpLog.debug('Insert of {0} jobs {1} ({2:.1f} jobs/sec)'.format(
+                        len(jobSpecs), sw_insertdb.get_elapsed_time(),
+                        len(jobSpecs) / insertTime if insertTime > 0 else 0))
             mainLog.debug('done')
             # check if being terminated
             if self.terminated(harvester_config.jobfetcher.sleepTime):
@@ -302,6 +302,9 @@ def main(daemon_mode=True):
         if options.pid:
             core_utils.set_file_permission(options.pid)
         core_utils.set_file_permission(logger_config.daemon['logdir'])
+        # write log files through a queue
+        if getattr(harvester_config.master, 'useQueueLogging', False):
+            core_utils.enable_queue_logging()
         _logger.info("start : version = {0}, last_commit = {1}".format(panda_pkg_info.release_version,
                                                                        commit_timestamp.timestamp))
 
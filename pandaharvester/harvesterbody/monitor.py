@@ -52,11 +52,13 @@ class Monitor(AgentBase):
         fifoCheckDuration = getattr(harvester_config.monitor, 'fifoCheckDuration', 30)
         fifoMaxWorkersPerChunk = getattr(harvester_config.monitor, 'fifoMaxWorkersPerChunk', 500)
         fifoProtectiveDequeue = getattr(harvester_config.monitor, 'fifoProtectiveDequeue', True)
+        fifoBlockingDequeue = getattr(harvester_config.monitor, 'fifoBlockingDequeue', False)
         eventBasedCheckInterval = getattr(harvester_config.monitor, 'eventBasedCheckInterval', 300)
         eventBasedTimeWindow = getattr(harvester_config.monitor, 'eventBasedTimeWindow', 450)
         eventBasedCheckMaxEvents = getattr(harvester_config.monitor, 'eventBasedCheckMaxEvents', 500)
         eventBasedEventLifetime = getattr(harvester_config.monitor, 'eventBasedEventLifetime', 1800)
         eventBasedRemoveMaxEvents = getattr(harvester_config.monitor, 'eventBasedRemoveMaxEvents', 2000)
+        bulkWorkerLock = getattr(harvester_config.monitor, 'bulkWorkerLock', False)
         last_DB_cycle_timestamp = 0
         last_event_delivery_timestamp = 0
         last_event_digest_timestamp = 0
@@ -80,7 +82,8 @@ class Monitor(AgentBase):
                 workSpecsPerQueue = self.dbProxy.get_workers_to_update(harvester_config.monitor.maxWorkers,
                                                                        harvester_config.monitor.checkInterval,
                                                                        harvester_config.monitor.lockInterval,
-                                                                       lockedBy)
+                                                                       lockedBy,
+                                                                       bulk_mode=bulkWorkerLock)
                 mainLog.debug('got {0} queues'.format(len(workSpecsPerQueue)))
                 # loop over all workers
                 for queueName, configIdWorkSpecs in iteritems(workSpecsPerQueue):
@@ -159,6 +162,9 @@ class Monitor(AgentBase):
                     while time.time() < last_fifo_cycle_timestamp + fifoCheckDuration:
                         sw.reset()
                         n_loops += 1
+                        if fifoBlockingDequeue:
+                            # block until the first chunk becomes due or new chunks arrive
+                            monitor_fifo.wait_for_due(max(last_fifo_cycle_timestamp + fifoCheckDuration - time.time(), 0))
                         retVal, overhead_time = monitor_fifo.to_check_workers()
                         if overhead_time is not None:
                             n_chunk_peeked_stat += 1
@@ -235,6 +241,8 @@ class Monitor(AgentBase):
                             mainLog.debug('workers in FIFO too young to check. Skipped')
                             if self.singleMode:
                                 break
+                            if fifoBlockingDequeue:
+                                continue
                             if overhead_time is not None:
                                 time.sleep(max(-overhead_time*random.uniform(0.1, 1), adjusted_sleepTime))
                             else:
@@ -244,31 +252,40 @@ class Monitor(AgentBase):
                 sw.reset()
                 n_chunk_put = 0
                 mainLog.debug('putting worker chunks to FIFO')
+                obj_list = []
+                score_list = []
                 for _dct in (obj_to_enqueue_dict, remaining_obj_to_enqueue_dict):
                     for ((queueName, configID), obj_to_enqueue) in iteritems(_dct):
-                        try:
-                            workSpecsToEnqueue, timeNow_timestamp, fifoCheckInterval = obj_to_enqueue
-                            if workSpecsToEnqueue:
-                                score = fifoCheckInterval + timeNow_timestamp
-                                monitor_fifo.put((queueName, workSpecsToEnqueue), score)
-                                n_chunk_put += 1
-                                mainLog.info('put a chunk of {0} workers of {1} to FIFO with score {2}'.format(
-                                                len(workSpecsToEnqueue), queueName, score))
-                        except Exception as errStr:
-                            mainLog.error('failed to put object from FIFO: {0}'.format(errStr))
+                        workSpecsToEnqueue, timeNow_timestamp, fifoCheckInterval = obj_to_enqueue
+                        if workSpecsToEnqueue:
+                            score = fifoCheckInterval + timeNow_timestamp
+                            obj_list.append((queueName, workSpecsToEnqueue))
+                            score_list.append(score)
+                            mainLog.info('put a chunk of {0} workers of {1} to FIFO with score {2}'.format(
+                                            len(workSpecsToEnqueue), queueName, score))
                 mainLog.debug('putting worker chunks to FIFO head')
                 for _dct in (obj_to_enqueue_to_head_dict, remaining_obj_to_enqueue_to_head_dict):
                     for ((queueName, configID), obj_to_enqueue_to_head) in iteritems(_dct):
-                        try:
-                            workSpecsToEnqueueToHead, timeNow_timestamp, fifoCheckInterval = obj_to_enqueue_to_head
-                            if workSpecsToEnqueueToHead:
-                                score = fifoCheckInterval + timeNow_timestamp - 2**32
-                                monitor_fifo.put((queueName, workSpecsToEnqueueToHead), score)
+                        workSpecsToEnqueueToHead, timeNow_timestamp, fifoCheckInterval = obj_to_enqueue_to_head
+                        if workSpecsToEnqueueToHead:
+                            score = fifoCheckInterval + timeNow_timestamp - 2**32
+                            obj_list.append((queueName, workSpecsToEnqueueToHead))
+                            score_list.append(score)
+                            mainLog.info('put a chunk of {0} workers of {1} to FIFO with score {2}'.format(
+                                            len(workSpecsToEnqueueToHead), queueName, score))
+                if obj_list:
+                    try:
+                        n_chunk_put = monitor_fifo.putmany(obj_list, score_list)
+                    except Exception as errStr:
+                        mainLog.error('failed to put objects to FIFO in bulk: {0}'.format(errStr))
+                        # retry one by one. nothing has been put since putmany is all-or-nothing
+                        n_chunk_put = 0
+                        for obj, score in zip(obj_list, score_list):
+                            try:
+                                monitor_fifo.put(obj, score)
                                 n_chunk_put += 1
-                                mainLog.info('put a chunk of {0} workers of {1} to FIFO with score {2}'.format(
-                                                len(workSpecsToEnqueueToHead), queueName, score))
-                        except Exception as errStr:
-                            mainLog.error('failed to put object from FIFO head: {0}'.format(errStr))
+                            except Exception as errStr:
+                                mainLog.error('failed to put object to FIFO: {0}'.format(errStr))
                 # delete protective dequeued objects
                 if fifoProtectiveDequeue and len(obj_dequeued_id_list) > 0:
                     monitor_fifo.delete(ids=obj_dequeued_id_list)
@@ -537,6 +554,26 @@ class Monitor(AgentBase):
         tmpQueLog.debug('done')
         return retVal
 
+    # call messenger methods in bulk if the messenger supports it, e.g. to reduce round trips to a remote
+    # messenger. call_list is a list of (workspec, [(method_name, args), ...]). Return a map of
+    # {workerID: {method_name: return value}}, which is empty if not supported or failed
+    def bulk_call_messenger(self, messenger, call_list, tmp_log):
+        if not call_list or not hasattr(messenger, 'bulk_call'):
+            return dict()
+        tmp_log.debug('bulk call to messenger for {0} workers'.format(len(call_list)))
+        retMap = messenger.bulk_call(call_list)
+        if retMap is None:
+            tmp_log.warning('failed in bulk call to messenger. Fall back to calls per worker')
+            return dict()
+        return retMap
+
+    # get return value of a messenger method from results of bulk call, or call the method if missing
+    def call_messenger(self, messenger, bulk_ret_map, method_name, workspec, *args):
+        try:
+            return bulk_ret_map[workspec.workerID][method_name]
+        except KeyError:
+            return getattr(messenger, method_name)(workspec, *args)
+
     # wrapper for checkWorkers
     def check_workers(self, mon_core, messenger, all_workers, queue_config, tmp_log, from_fifo):
         # check timeout value
@@ -551,9 +588,22 @@ class Monitor(AgentBase):
             workerQueueTimeLimit = harvester_config.monitor.workerQueueTimeLimit
         except AttributeError:
             workerQueueTimeLimit = 172800
+        try:
+            # check if the queue configuration requires checking for worker heartbeat
+            worker_heartbeat_limit = int(queue_config.messenger['worker_heartbeat'])
+        except (AttributeError, KeyError):
+            worker_heartbeat_limit = None
         workersToCheck = []
         thingsToPostProcess = []
         retMap = dict()
+        # check if job is requested in bulk
+        bulkCallList = []
+        for workSpec in all_workers:
+            if not workSpec.has_work_params('finalMonStatus') \
+                    and ((workSpec.hasJob == 0 and workSpec.mapType != WorkSpec.MT_NoJob)
+                         or workSpec.nJobsToReFill in [0, None]):
+                bulkCallList.append((workSpec, [('job_requested', ())]))
+        bulkRetMap = self.bulk_call_messenger(messenger, bulkCallList, tmp_log)
         for workSpec in all_workers:
             eventsRequestParams = {}
             eventsToUpdate = []
@@ -571,7 +621,7 @@ class Monitor(AgentBase):
                 # job-level late binding
                 if workSpec.hasJob == 0 and workSpec.mapType != WorkSpec.MT_NoJob:
                     # check if job is requested
-                    jobRequested = messenger.job_requested(workSpec)
+                    jobRequested = self.call_messenger(messenger, bulkRetMap, 'job_requested', workSpec)
                     if jobRequested:
                         # set ready when job is requested
                         workStatus = WorkSpec.ST_ready
@@ -579,7 +629,7 @@ class Monitor(AgentBase):
                         workStatus = workSpec.status
                 elif workSpec.nJobsToReFill in [0, None]:
                     # check if job is requested to refill free slots
-                    jobRequested = messenger.job_requested(workSpec)
+                    jobRequested = self.call_messenger(messenger, bulkRetMap, 'job_requested', workSpec)
                     if jobRequested:
                         nJobsToReFill = jobRequested
                     workersToCheck.append(workSpec)
@@ -611,6 +661,23 @@ class Monitor(AgentBase):
             else:
                 tmp_log.debug('Nothing to be checked with plugin')
                 tmpOut = []
+            # get information from messenger in bulk
+            bulkCallList = []
+            for workSpec, _ in itertools.chain(zip(workersToCheck, tmpOut), thingsToPostProcess):
+                if workSpec.workerID not in retMap:
+                    continue
+                methodList = [('kill_requested', ())]
+                if worker_heartbeat_limit:
+                    methodList.append(('is_alive', (worker_heartbeat_limit,)))
+                methodList += [('get_work_attributes', ()), ('get_files_to_stage_out', ())]
+                if workSpec.eventsRequest in [WorkSpec.EV_useEvents, WorkSpec.EV_requestEvents]:
+                    methodList.append(('events_to_update', ()))
+                if workSpec.eventsRequest == WorkSpec.EV_useEvents:
+                    methodList.append(('events_requested', ()))
+                if workSpec.mapType == WorkSpec.MT_NoJob:
+                    methodList.append(('get_panda_ids', ()))
+                bulkCallList.append((workSpec, methodList))
+            bulkRetMap = self.bulk_call_messenger(messenger, bulkCallList, tmp_log)
             timeNow = datetime.datetime.utcnow()
             for workSpec, (newStatus, diagMessage) in itertools.chain(
                     zip(workersToCheck, tmpOut), thingsToPostProcess):
@@ -635,7 +702,7 @@ class Monitor(AgentBase):
                             # use original status
                             newStatus = workSpec.status
                     # request kill
-                    if messenger.kill_requested(workSpec):
+                    if self.call_messenger(messenger, bulkRetMap, 'kill_requested', workSpec):
                         tmp_log.debug('kill workerID={0} as requested'.format(workerID))
                         self.dbProxy.kill_worker(workSpec.workerID)
                     # stuck queuing for too long
@@ -647,16 +714,11 @@ class Monitor(AgentBase):
                         diagMessage = 'Killed by Harvester due to worker queuing too long' + diagMessage
                         workSpec.set_pilot_error(PilotErrors.ERR_FAILEDBYSERVER, diagMessage)
                     # expired heartbeat - only when requested in the configuration
-                    try:
-                        # check if the queue configuration requires checking for worker heartbeat
-                        worker_heartbeat_limit = int(queue_config.messenger['worker_heartbeat'])
-                    except (AttributeError, KeyError):
-                        worker_heartbeat_limit = None
                     tmp_log.debug(
                         'workerID={0} heartbeat limit is configured to {1}'.format(workerID,
                                                                                    worker_heartbeat_limit))
                     if worker_heartbeat_limit:
-                        if messenger.is_alive(workSpec, worker_heartbeat_limit):
+                        if self.call_messenger(messenger, bulkRetMap, 'is_alive', workSpec, worker_heartbeat_limit):
                             tmp_log.debug('heartbeat for workerID={0} is valid'.format(workerID))
                         else:
                             tmp_log.debug('heartbeat for workerID={0} expired: sending kill request'.format(
@@ -665,22 +727,22 @@ class Monitor(AgentBase):
                             diagMessage = 'Killed by Harvester due to worker heartbeat expired. ' + diagMessage
                             workSpec.set_pilot_error(PilotErrors.ERR_FAILEDBYSERVER, diagMessage)
                     # get work attributes
-                    workAttributes = messenger.get_work_attributes(workSpec)
+                    workAttributes = self.call_messenger(messenger, bulkRetMap, 'get_work_attributes', workSpec)
                     retMap[workerID]['workAttributes'] = workAttributes
                     # get output files
-                    filesToStageOut = messenger.get_files_to_stage_out(workSpec)
+                    filesToStageOut = self.call_messenger(messenger, bulkRetMap, 'get_files_to_stage_out', workSpec)
                     retMap[workerID]['filesToStageOut'] = filesToStageOut
                     # get events to update
                     if workSpec.eventsRequest in [WorkSpec.EV_useEvents, WorkSpec.EV_requestEvents]:
-                        eventsToUpdate = messenger.events_to_update(workSpec)
+                        eventsToUpdate = self.call_messenger(messenger, bulkRetMap, 'events_to_update', workSpec)
                         retMap[workerID]['eventsToUpdate'] = eventsToUpdate
                     # request events
                     if workSpec.eventsRequest == WorkSpec.EV_useEvents:
-                        eventsRequestParams = messenger.events_requested(workSpec)
+                        eventsRequestParams = self.call_messenger(messenger, bulkRetMap, 'events_requested', workSpec)
                         retMap[workerID]['eventsRequestParams'] = eventsRequestParams
                     # get PandaIDs for pull model
                     if workSpec.mapType == WorkSpec.MT_NoJob:
-                        pandaIDs = messenger.get_panda_ids(workSpec)
+                        pandaIDs = self.call_messenger(messenger, bulkRetMap, 'get_panda_ids', workSpec)
                     retMap[workerID]['pandaIDs'] = pandaIDs
                     # keep original new status
                     retMap[workerID]['monStatus'] = newStatus
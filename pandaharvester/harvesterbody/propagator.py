@@ -73,6 +73,7 @@ class Propagator(AgentBase):
                 mainLog.debug('update_jobs for {0} jobs took {1}'.format(len(jobListToUpdate),
                                                                               sw.get_elapsed_time()))
                 # logging
+                jobListToWriteBack = []
                 for tmpJobSpec, tmpRet in zip(jobListToSkip+jobListToCheck+jobListToUpdate, retList):
                     if tmpRet['StatusCode'] == 0:
                         if tmpJobSpec in jobListToUpdate:
@@ -113,10 +114,16 @@ class Propagator(AgentBase):
                                                                PilotErrors.pilotError[PilotErrors.ERR_PANDAKILL])
                                     tmpJobSpec.stateChangeTime = datetime.datetime.utcnow()
                                     tmpJobSpec.trigger_propagation()
-                        self.dbProxy.update_job(tmpJobSpec, {'propagatorLock': self.get_pid()})
+                        jobListToWriteBack.append(tmpJobSpec)
                     else:
                         mainLog.error('failed to update PandaID={0} status={1}'.format(tmpJobSpec.PandaID,
                                                                                        tmpJobSpec.status))
+                # update jobs in local database
+                if len(jobListToWriteBack) > 0:
+                    sw.reset()
+                    self.dbProxy.update_jobs_bulk(jobListToWriteBack, {'propagatorLock': self.get_pid()})
+                    mainLog.debug('update_jobs_bulk for {0} jobs took {1}'.format(len(jobListToWriteBack),
+                                                                                  sw.get_elapsed_time()))
             mainLog.debug('getting workers to propagate')
             sw.reset()
             workSpecs = self.dbProxy.get_workers_to_propagate(harvester_config.propagator.maxWorkers,
@@ -134,6 +141,7 @@ class Propagator(AgentBase):
                 if retList is None:
                     mainLog.error('failed to update workers with {0}'.format(tmpErrStr))
                 else:
+                    workListToWriteBack = []
                     for tmpWorkSpec, tmpRet in zip(workList, retList):
                         if tmpRet:
                             mainLog.debug('updated workerID={0} status={1}'.format(tmpWorkSpec.workerID,
@@ -149,10 +157,13 @@ class Propagator(AgentBase):
                             # disable further update
                             if tmpWorkSpec.is_final_status():
                                 tmpWorkSpec.disable_propagation()
-                            self.dbProxy.update_worker(tmpWorkSpec, {'workerID': tmpWorkSpec.workerID})
+                            workListToWriteBack.append(tmpWorkSpec)
                         else:
                             mainLog.error('failed to update workerID={0} status={1}'.format(tmpWorkSpec.workerID,
                                                                                             tmpWorkSpec.status))
+                    # update workers in local database
+                    if len(workListToWriteBack) > 0:
+                        self.dbProxy.update_workers_bulk(workListToWriteBack)
             mainLog.debug('update_workers for {0} workers took {1}'.format(iWorkers,
                                                                       sw.get_elapsed_time()))
             mainLog.debug('getting commands')
@@ -66,6 +66,9 @@ class Submitter(AgentBase):
                             tmpQueueName = resMap[tmpResource]
                             if tmpQueueName in curWorkers:
                                 curWorkers[tmpQueueName][tmpResource]['nNewWorkers'] = tmpNewVal
+                # reload worker limits which may be changed by the commands
+                if len(commandSpecs) > 0:
+                    self.workerAdjuster.invalidate_snapshot()
 
                 # define number of new workers
                 if len(curWorkers) == 0:
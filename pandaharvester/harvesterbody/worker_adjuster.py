@@ -1,4 +1,6 @@
 import copy
+import time
+import threading
 from future.utils import iteritems
 
 from pandaharvester.harvesterconfig import harvester_config
@@ -24,6 +26,52 @@ class WorkerAdjuster(object):
             self.maxNewWorkers = harvester_config.submitter.maxNewWorkers
         except AttributeError:
             self.maxNewWorkers = None
+        # lifetime of snapshot in sec. Worker limits of all queues are loaded in bulk if positive
+        try:
+            self.snapshotLifetime = harvester_config.submitter.adjusterSnapshotLifetime
+        except AttributeError:
+            self.snapshotLifetime = 10
+        self.snapshot = None
+        self.snapshotLock = threading.Lock()
+
+    # get snapshot of queue status, job statistics, and worker limits which is reused within the lifetime
+    def get_snapshot(self):
+        with self.snapshotLock:
+            timeNow = time.time()
+            if self.snapshot is not None and timeNow - self.snapshot['time'] < self.snapshotLifetime:
+                return self.snapshot
+            snapshot = dict()
+            snapshot['time'] = timeNow
+            # get queue status from views pre-parsed by cacher
+            queueViews = self.dbProxy.get_cache_views("panda_queues.json", None)
+            if queueViews is not None:
+                snapshot['queueStat'] = queueViews['status']
+            else:
+                # read raw data when views are unavailable
+                snapshot['queueStat'] = dict()
+                queueStatCache = self.dbProxy.get_cache("panda_queues.json", None)
+                if queueStatCache is not None and isinstance(queueStatCache.data, dict):
+                    for queueName, queueDict in iteritems(queueStatCache.data):
+                        if isinstance(queueDict, dict) and 'status' in queueDict:
+                            snapshot['queueStat'][queueName] = queueDict['status']
+            # get job statistics
+            job_stats = self.dbProxy.get_cache("job_statistics.json", None)
+            if job_stats is None:
+                snapshot['jobStats'] = dict()
+            else:
+                snapshot['jobStats'] = job_stats.data
+            # get worker limits of all queues
+            if self.snapshotLifetime > 0:
+                snapshot['workerLimits'] = self.dbProxy.get_worker_limits_bulk()
+            else:
+                snapshot['workerLimits'] = None
+            self.snapshot = snapshot
+            return snapshot
+
+    # invalidate snapshot, e.g., when queue limits are changed
+    def invalidate_snapshot(self):
+        with self.snapshotLock:
+            self.snapshot = None
 
     # define number of workers to submit based on various information
     def define_num_workers(self, static_num_workers, site_name):
@@ -32,25 +80,20 @@ class WorkerAdjuster(object):
         tmpLog.debug('static_num_workers: {0}'.format(static_num_workers))
         dyn_num_workers = copy.deepcopy(static_num_workers)
         try:
-            # get queue status
-            queueStat = self.dbProxy.get_cache("panda_queues.json", None)
-            if queueStat is None:
-                queueStat = dict()
-            else:
-                queueStat = queueStat.data
-
-            # get job statistics
-            job_stats = self.dbProxy.get_cache("job_statistics.json", None)
-            if job_stats is None:
-                job_stats = dict()
-            else:
-                job_stats = job_stats.data
+            # get queue status, job statistics, and worker limits
+            snapshot = self.get_snapshot()
+            queueStat = snapshot['queueStat']
+            job_stats = snapshot['jobStats']
+            workerLimitsMap = snapshot['workerLimits']
 
             # define num of new workers
             for queueName in static_num_workers:
                 # get queue
                 queueConfig = self.queueConfigMapper.get_queue(queueName)
-                workerLimits_dict = self.dbProxy.get_worker_limits(queueName)
+                if workerLimitsMap is not None and queueName in workerLimitsMap:
+                    workerLimits_dict = workerLimitsMap[queueName]
+                else:
+                    workerLimits_dict = self.dbProxy.get_worker_limits(queueName)
                 maxWorkers = workerLimits_dict.get('maxWorkers', 0)
                 nQueueLimit = workerLimits_dict.get('nQueueLimitWorker', 0)
                 nQueueLimitPerRT = workerLimits_dict['nQueueLimitWorkerPerRT']
@@ -62,12 +105,11 @@ class WorkerAdjuster(object):
                                  format(queueName, resource_type, tmpVal))
 
                     # set 0 to num of new workers when the queue is disabled
-                    if queueName in queueStat and queueStat[queueName]['status'] in ['offline', 'standby',
-                                                                                     'maintenance']:
+                    if queueName in queueStat and queueStat[queueName] in ['offline', 'standby', 'maintenance']:
                         dyn_num_workers[queueName][resource_type]['nNewWorkers'] = 0
-                        retMsg = 'set nNewWorkers=0 since status={0}'.format(queueStat[queueName]['status'])
+                        retMsg = 'set nNewWorkers=0 since status={0}'.format(queueStat[queueName])
                         tmpLog.debug(retMsg)
-                        apf_msg = 'Not submitting workers since queue status = {0}'.format(queueStat[queueName]['status'])
+                        apf_msg = 'Not submitting workers since queue status = {0}'.format(queueStat[queueName])
                         continue
 
                     # protection against not-up-to-date queue config
@@ -10,26 +10,36 @@ except Exception:
     pass
 import sys
 import json
+import time
 import pickle
 import zlib
 import uuid
 import inspect
 import datetime
+import threading
 import requests
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from future.utils import iteritems
+from six.moves.urllib.parse import urlencode
 # TO BE REMOVED for python2.7
 import requests.packages.urllib3
 try:
     requests.packages.urllib3.disable_warnings()
 except Exception:
     pass
+from requests.packages.urllib3.util.retry import Retry
 from pandaharvester.harvestercore import core_utils
 from pandaharvester.harvesterconfig import harvester_config
 
 from .base_communicator import BaseCommunicator
 
 
+# timing statistics per endpoint shared by all communicators in the process
+_timingStats = dict()
+_timingLock = threading.Lock()
+
+
 # connection class
 class PandaCommunicator(BaseCommunicator):
     # constructor
@@ -42,6 +52,148 @@ class PandaCommunicator(BaseCommunicator):
                 self.useInspect = True
         else:
             self.verbose = False
+        # persistent HTTP session
+        self.useSession = getattr(harvester_config.pandacon, 'useSession', False)
+        self.session = None
+        self.sessionCreationTime = None
+        self.sessionLock = threading.Lock()
+        self.useCompression = getattr(harvester_config.pandacon, 'useCompression', False)
+        self.compressionMethod = getattr(harvester_config.pandacon, 'compressionMethod', 'gzip')
+        self.compressionThreshold = getattr(harvester_config.pandacon, 'compressionThreshold', 1024)
+        self.compressionLevel = getattr(harvester_config.pandacon, 'compressionLevel', 6)
+
+    # get HTTP session which is renewed after the max age
+    def get_session(self):
+        with self.sessionLock:
+            return self._get_session()
+
+    # get HTTP session without lock
+    def _get_session(self):
+        maxAge = getattr(harvester_config.pandacon, 'sessionMaxAge', 3600)
+        if self.session is not None and time.time() - self.sessionCreationTime > maxAge:
+            self._reset_session()
+        if self.session is None:
+            poolSize = getattr(harvester_config.pandacon, 'sessionPoolSize', 10)
+            nRetries = getattr(harvester_config.pandacon, 'sessionRetries', 3)
+            backoffFactor = getattr(harvester_config.pandacon, 'sessionBackoffFactor', 0.5)
+            # retry only when connection failed, since POST is not always idempotent
+            retry = Retry(total=nRetries, connect=nRetries, read=0, redirect=0, status=0,
+                          backoff_factor=backoffFactor)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize,
+                                                    max_retries=retry)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update({'Connection': 'keep-alive'})
+            self.session = session
+            self.sessionCreationTime = time.time()
+        return self.session
+
+    # close HTTP session. Nothing is done if the session was already renewed by another thread
+    def reset_session(self, session=None):
+        with self.sessionLock:
+            if session is None or session is self.session:
+                self._reset_session()
+
+    # close HTTP session without lock
+    def _reset_session(self):
+        if self.session is not None:
+            try:
+                self.session.close()
+            except Exception:
+                pass
+        self.session = None
+        self.sessionCreationTime = None
+
+    # compress data with gzip or deflate(zlib)
+    def compress_data(self, data):
+        if self.compressionMethod == 'gzip':
+            compObj = zlib.compressobj(self.compressionLevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            compObj = zlib.compressobj(self.compressionLevel)
+        return compObj.compress(data) + compObj.flush()
+
+    # compress form data if it is larger than the threshold. Data are url-encoded in the same way as requests,
+    # and are left as they are unless compressed
+    def encode_request_body(self, kwargs):
+        if not isinstance(kwargs.get('data'), dict):
+            return 0
+        body = urlencode(kwargs['data'], doseq=True)
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        if len(body) < self.compressionThreshold:
+            return 0
+        sw = core_utils.get_stopwatch()
+        body = self.compress_data(body)
+        compressTime = sw.get_elapsed_time_in_sec(precise=True)
+        headers = dict(kwargs.get('headers', {}))
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        headers['Content-Encoding'] = 'gzip' if self.compressionMethod == 'gzip' else 'deflate'
+        kwargs['data'] = body
+        kwargs['headers'] = headers
+        return compressTime
+
+    # send POST request through the session if enabled and record timing
+    def send_post(self, path, url, **kwargs):
+        sw = core_utils.get_stopwatch()
+        isFailed = True
+        nBytesSent = 0
+        nBytesReceived = 0
+        compressTime = 0
+        try:
+            # compress request and accept compressed response
+            if self.useCompression:
+                compressTime = self.encode_request_body(kwargs)
+                kwargs['headers'] = dict(kwargs.get('headers', {}))
+                kwargs['headers']['Accept-Encoding'] = 'gzip, deflate'
+            if self.useSession:
+                if 'headers' in kwargs:
+                    kwargs['headers'] = dict(kwargs['headers'])
+                    kwargs['headers']['Connection'] = 'keep-alive'
+                session = self.get_session()
+                try:
+                    res = session.post(url, **kwargs)
+                except Exception:
+                    # recycle the session since connections may be broken
+                    self.reset_session(session)
+                    raise
+            else:
+                res = requests.post(url, **kwargs)
+            isFailed = res.status_code != 200
+            # bytes on the wire before decompression
+            if res.request.body is not None:
+                nBytesSent = len(res.request.body)
+            try:
+                nBytesReceived = int(res.headers['Content-Length'])
+            except Exception:
+                nBytesReceived = len(res.content)
+            return res
+        finally:
+            elapsedTime = sw.get_elapsed_time_in_sec(precise=True)
+            with _timingLock:
+                stats = _timingStats.setdefault(path, {'nCalls': 0, 'nFailures': 0,
+                                                       'totalTime': 0.0, 'maxTime': 0.0,
+                                                       'bytesSent': 0, 'bytesReceived': 0,
+                                                       'compressTime': 0.0})
+                stats['nCalls'] += 1
+                if isFailed:
+                    stats['nFailures'] += 1
+                stats['totalTime'] += elapsedTime
+                stats['maxTime'] = max(stats['maxTime'], elapsedTime)
+                stats['bytesSent'] += nBytesSent
+                stats['bytesReceived'] += nBytesReceived
+                stats['compressTime'] += compressTime
+
+    # get timing statistics per endpoint
+    def get_timing_stats(self, reset=False):
+        retMap = dict()
+        with _timingLock:
+            for path, stats in iteritems(_timingStats):
+                retMap[path] = dict(stats)
+                retMap[path]['avgTime'] = stats['totalTime'] / stats['nCalls'] if stats['nCalls'] > 0 else 0.0
+            if reset:
+                _timingStats.clear()
+        return retMap
 
     # POST with http
     def post(self, path, data):
@@ -56,11 +208,11 @@ class PandaCommunicator(BaseCommunicator):
             url = '{0}/{1}'.format(harvester_config.pandacon.pandaURL, path)
             if self.verbose:
                 tmpLog.debug('exec={0} URL={1} data={2}'.format(tmpExec, url, str(data)))
-            res = requests.post(url,
-                                data=data,
-                                headers={"Accept": "application/json",
-                                         "Connection": "close"},
-                                timeout=harvester_config.pandacon.timeout)
+            res = self.send_post(path, url,
+                                 data=data,
+                                 headers={"Accept": "application/json",
+                                          "Connection": "close"},
+                                 timeout=harvester_config.pandacon.timeout)
             if self.verbose:
                 tmpLog.debug('exec={0} code={1} return={2}'.format(tmpExec, res.status_code, res.text))
             if res.status_code == 200:
@@ -91,13 +243,13 @@ class PandaCommunicator(BaseCommunicator):
                 cert = (harvester_config.pandacon.cert_file,
                         harvester_config.pandacon.key_file)
             sw = core_utils.get_stopwatch()
-            res = requests.post(url,
-                                data=data,
-                                headers={"Accept": "application/json",
-                                         "Connection": "close"},
-                                timeout=harvester_config.pandacon.timeout,
-                                verify=harvester_config.pandacon.ca_cert,
-                                cert=cert)
+            res = self.send_post(path, url,
+                                 data=data,
+                                 headers={"Accept": "application/json",
+                                          "Connection": "close"},
+                                 timeout=harvester_config.pandacon.timeout,
+                                 verify=harvester_config.pandacon.ca_cert,
+                                 cert=cert)
             if self.verbose:
                 tmpLog.debug('exec={0} code={1} {3}. return={2}'.format(tmpExec, res.status_code, res.text,
                                                                         sw.get_elapsed_time()))
@@ -129,11 +281,11 @@ class PandaCommunicator(BaseCommunicator):
             if cert is None:
                 cert = (harvester_config.pandacon.cert_file,
                         harvester_config.pandacon.key_file)
-            res = requests.post(url,
-                                files=files,
-                                timeout=harvester_config.pandacon.timeout,
-                                verify=harvester_config.pandacon.ca_cert,
-                                cert=cert)
+            res = self.send_post(path, url,
+                                 files=files,
+                                 timeout=harvester_config.pandacon.timeout,
+                                 verify=harvester_config.pandacon.ca_cert,
+                                 cert=cert)
             if self.verbose:
                 tmpLog.debug('exec={0} code={1} return={2}'.format(tmpExec, res.status_code, res.text))
             if res.status_code == 200:
@@ -199,9 +351,11 @@ class PandaCommunicator(BaseCommunicator):
         sw = core_utils.get_stopwatch()
         tmpLogG = self.make_logger('id={0}'.format(id), method_name='update_jobs')
         tmpLogG.debug('update {0} jobs'.format(len(jobspec_list)))
-        retList = []
-        # update events
-        for jobSpec in jobspec_list:
+        nLookup = getattr(harvester_config.pandacon, 'updateJobsChunkSize', 100)
+        nThreads = getattr(harvester_config.pandacon, 'updateJobsConcurrency', 1)
+
+        # update events of a job
+        def _update_events(jobSpec):
             eventRanges, eventSpecs = jobSpec.to_event_data(max_events=10000)
             if eventRanges != []:
                 tmpLogG.debug('update {0} events for PandaID={1}'.format(len(eventSpecs), jobSpec.PandaID))
@@ -210,12 +364,11 @@ class PandaCommunicator(BaseCommunicator):
                     for eventSpec, retVal in zip(eventSpecs, tmpRet['Returns']):
                         if retVal in [True, False] and eventSpec.is_final_status():
                             eventSpec.subStatus = 'done'
-        # update jobs in bulk
-        nLookup = 100
-        iLookup = 0
-        while iLookup < len(jobspec_list):
+
+        # update a chunk of jobs in bulk
+        def _update_job_chunk(jobSpecSubList):
+            retList = []
             dataList = []
-            jobSpecSubList = jobspec_list[iLookup:iLookup+nLookup]
             for jobSpec in jobSpecSubList:
                 data = jobSpec.get_job_attributes_for_panda()
                 data['jobId'] = jobSpec.PandaID
@@ -276,7 +429,21 @@ class PandaCommunicator(BaseCommunicator):
                 tmpLog.debug('data={0}'.format(str(data)))
                 tmpLog.debug('done with {0}'.format(str(retMap)))
                 retList.append(retMap)
-            iLookup += nLookup
+            return retList
+
+        # update events first, and then jobs in chunks. The order of jobs is preserved in the return list
+        chunkList = list(core_utils.create_shards(jobspec_list, nLookup))
+        retList = []
+        if nThreads > 1:
+            with ThreadPoolExecutor(nThreads) as thread_pool:
+                list(thread_pool.map(_update_events, jobspec_list))
+                for tmpRetList in thread_pool.map(_update_job_chunk, chunkList):
+                    retList += tmpRetList
+        else:
+            for jobSpec in jobspec_list:
+                _update_events(jobSpec)
+            for jobSpecSubList in chunkList:
+                retList += _update_job_chunk(jobSpecSubList)
         tmpLogG.debug('done' + sw.get_elapsed_time())
         return retList
 
@@ -9,11 +9,13 @@ import time
 import zlib
 import uuid
 import math
+import mmap
 import fcntl
 import codecs
 import base64
 import random
-import inspect
+import atexit
+import logging
 import datetime
 import threading
 import traceback
@@ -23,6 +25,8 @@ import Cryptodome.Hash.HMAC
 import Cryptodome.Cipher.AES
 from future.utils import iteritems
 from contextlib import contextmanager
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from threading import get_ident
@@ -34,6 +38,17 @@ try:
 except ImportError:
     import pickle
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    from logging.handlers import QueueHandler, QueueListener
+except ImportError:
+    QueueHandler = None
+    QueueListener = None
+
 from .work_spec import WorkSpec
 from .file_spec import FileSpec
 from .event_spec import EventSpec
@@ -44,6 +59,10 @@ from pandaharvester.harvesterconfig import harvester_config
 
 with_memory_profile = False
 
+# dispatcher and listener when log records are sent through a queue
+log_dispatcher = None
+log_listener = None
+
 
 # lock for synchronization
 sync_lock = threading.Lock()
@@ -149,36 +168,61 @@ def enable_memory_profiling():
 # setup logger
 def setup_logger(name=None):
     if name is None:
-        frm = inspect.stack()[1][0]
-        mod = inspect.getmodule(frm)
-        name = mod.__name__.split('.')[-1]
+        name = sys._getframe(1).f_globals['__name__'].split('.')[-1]
     try:
         log_level = getattr(harvester_config.log_level, name)
-        return PandaLogger().getLogger(name, log_level=log_level)
+        tmpLog = PandaLogger().getLogger(name, log_level=log_level)
     except Exception:
-        pass
-    return PandaLogger().getLogger(name)
+        tmpLog = PandaLogger().getLogger(name)
+    # send records through the queue if enabled
+    if log_dispatcher is not None:
+        log_dispatcher.take_handlers(tmpLog)
+    return tmpLog
+
+
+# LogWrapper which skips building messages when they are not emitted. Messages can take arguments
+# for str.format which are applied only when they are emitted
+class LazyLogWrapper(LogWrapper):
+    # check if message is emitted or sent to the hook
+    def is_needed(self, level):
+        return self.hook is not None or self.logger.isEnabledFor(level)
+
+    def debug(self, msg, *args):
+        if self.is_needed(logging.DEBUG):
+            LogWrapper.debug(self, msg.format(*args) if args else msg)
+
+    def info(self, msg, *args):
+        if self.is_needed(logging.INFO):
+            LogWrapper.info(self, msg.format(*args) if args else msg)
+
+    def warning(self, msg, *args):
+        if self.is_needed(logging.WARNING):
+            LogWrapper.warning(self, msg.format(*args) if args else msg)
+
+    def error(self, msg, *args):
+        if self.is_needed(logging.ERROR):
+            LogWrapper.error(self, msg.format(*args) if args else msg)
 
 
 # make logger
 def make_logger(tmp_log, token=None, method_name=None, hook=None):
     # get method name of caller
     if method_name is None:
-        tmpStr = inspect.stack()[1][3]
+        tmpStr = sys._getframe(1).f_code.co_name
     else:
         tmpStr = method_name
     if token is not None:
         tmpStr += ' <{0}>'.format(token)
     else:
-        tmpStr += ' :'.format(token)
-    newLog = LogWrapper(tmp_log, tmpStr, seeMem=with_memory_profile, hook=hook)
+        tmpStr += ' :'
+    newLog = LazyLogWrapper(tmp_log, tmpStr, seeMem=with_memory_profile, hook=hook)
     return newLog
 
 
 # dump error message
 def dump_error_message(tmp_log, err_str=None, no_message=False):
     if not isinstance(tmp_log, LogWrapper):
-        methodName = '{0} : '.format(inspect.stack()[1][3])
+        methodName = '{0} : '.format(sys._getframe(1).f_code.co_name)
     else:
         methodName = ''
     # error
@@ -191,6 +235,50 @@ def dump_error_message(tmp_log, err_str=None, no_message=False):
     return err_str
 
 
+# handler to pass records from the log queue to handlers taken from loggers
+class LogDispatcher(object):
+    # constructor
+    def __init__(self, log_queue):
+        self.logQueue = log_queue
+        self.handlerMap = {}
+
+    # replace handlers of a logger with a queue handler
+    def take_handlers(self, tmp_log):
+        handlers = [handler for handler in tmp_log.handlers if not isinstance(handler, QueueHandler)]
+        if not handlers:
+            return
+        for handler in handlers:
+            tmp_log.removeHandler(handler)
+        self.handlerMap[tmp_log.name] = self.handlerMap.get(tmp_log.name, []) + handlers
+        if not any(isinstance(handler, QueueHandler) for handler in tmp_log.handlers):
+            tmp_log.addHandler(QueueHandler(self.logQueue))
+
+    # called by the listener thread
+    def handle(self, record):
+        for handler in self.handlerMap.get(record.name, []):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+# send log records to handlers through a queue and a listener thread so that agent threads don't wait for
+# file I/O. Must be called after being daemonized since the listener thread doesn't survive fork
+def enable_queue_logging():
+    global log_dispatcher
+    global log_listener
+    if QueueHandler is None or log_listener is not None:
+        return False
+    logQueue = queue.Queue()
+    log_dispatcher = LogDispatcher(logQueue)
+    for loggerName, loggerObj in list(iteritems(logging.Logger.manager.loggerDict)):
+        if loggerName.startswith('panda') and isinstance(loggerObj, logging.Logger):
+            log_dispatcher.take_handlers(loggerObj)
+    log_listener = QueueListener(logQueue, log_dispatcher)
+    log_listener.start()
+    # flush records at exit
+    atexit.register(log_listener.stop)
+    return True
+
+
 # sleep for random duration and return True if no more sleep is needed
 def sleep(interval, stop_event, randomize=True):
     if randomize and interval > 0:
@@ -250,6 +338,105 @@ def calc_adler32(file_name):
     return hex(val)[2:10].zfill(8).lower()
 
 
+# checksum engine to calculate adler32 of files in parallel. Checksums are cached with (path, size, mtime).
+# Bulk calculations from all threads share one thread pool to bound the number of files read concurrently
+class ChecksumEngine(object):
+    # constructor
+    def __init__(self, cache_size=100000, block_size=32 * 1024 * 1024, n_threads=4):
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.cacheSize = cache_size
+        self.blockSize = block_size
+        self.nThreads = n_threads
+        self.threadPool = None
+        self.nHits = 0
+        self.nMisses = 0
+
+    # calculate adler32 with mmap
+    def _calc_adler32(self, file_name):
+        val = 1
+        with open(file_name, 'rb') as fp:
+            try:
+                mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except Exception:
+                # empty or unmappable file
+                return calc_adler32(file_name)
+            # slice memoryview to avoid copying blocks. mmap in python 2 doesn't support memoryview
+            try:
+                mv = memoryview(mm)
+            except TypeError:
+                mv = None
+            try:
+                for offset in range(0, len(mm), self.blockSize):
+                    if mv is not None:
+                        val = zlib.adler32(mv[offset:offset + self.blockSize], val)
+                    else:
+                        val = zlib.adler32(mm[offset:offset + self.blockSize], val)
+            finally:
+                if mv is not None:
+                    mv.release()
+                mm.close()
+        if val < 0:
+            val += 2 ** 32
+        return hex(val)[2:10].zfill(8).lower()
+
+    # get the shared thread pool
+    def _get_thread_pool(self):
+        with self.lock:
+            if self.threadPool is None:
+                self.threadPool = ThreadPoolExecutor(self.nThreads)
+            return self.threadPool
+
+    # get size and checksum of a file
+    def get_size_and_checksum(self, file_name):
+        st = os.stat(file_name)
+        key = (file_name, st.st_size, st.st_mtime)
+        with self.lock:
+            if key in self.cache:
+                self.nHits += 1
+                return st.st_size, self.cache[key]
+            self.nMisses += 1
+        chksum = self._calc_adler32(file_name)
+        with self.lock:
+            self.cache[key] = chksum
+            while len(self.cache) > self.cacheSize:
+                self.cache.popitem(last=False)
+        return st.st_size, chksum
+
+    # calculate adler32 of a file
+    def calc_adler32(self, file_name):
+        return self.get_size_and_checksum(file_name)[1]
+
+    # get sizes and checksums of files with the shared thread pool. Files which failed are omitted from the returned map
+    def get_size_and_checksum_bulk(self, file_names):
+        # get size and checksum without exception
+        def _get(file_name):
+            try:
+                return self.get_size_and_checksum(file_name)
+            except Exception:
+                return None
+        fileNames = list(set(file_names))
+        retMap = dict()
+        if len(fileNames) == 0:
+            return retMap
+        threadPool = self._get_thread_pool()
+        futureList = [threadPool.submit(_get, fileName) for fileName in fileNames]
+        for fileName, future in zip(fileNames, futureList):
+            retVal = future.result()
+            if retVal is not None:
+                retMap[fileName] = retVal
+        return retMap
+
+
+# checksum engine shared in the process
+checksum_engine = ChecksumEngine(n_threads=getattr(harvester_config.master, 'nChecksumThreads', 4))
+
+
+# get checksum engine
+def get_checksum_engine():
+    return checksum_engine
+
+
 # get output file report
 def get_output_file_report(jobspec):
     if jobspec.outputFilesToReport is not None:
@@ -499,6 +686,157 @@ def get_global_dict():
     return global_dict
 
 
+# process-local store of cached data with TTL, revalidation and single-flight loading
+class CacheStore(object):
+    # constructor
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> {'data', 'lastUpdate', 'checkTime', 'views'}
+        self.entries = dict()
+        # locks per key to load data only in one thread
+        self.keyLocks = dict()
+        # main key -> function to make pre-parsed views from data
+        self.viewBuilders = dict()
+        self.stats = {'hits': 0, 'misses': 0, 'probes': 0, 'revalidations': 0, 'refreshes': 0}
+
+    # get lock for a key
+    def get_key_lock(self, key):
+        with self.lock:
+            if key not in self.keyLocks:
+                self.keyLocks[key] = threading.Lock()
+            return self.keyLocks[key]
+
+    # get entry if it was checked within ttl sec
+    def get_fresh_entry(self, key, ttl):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry['checkTime'] < ttl:
+                return entry
+        return None
+
+    # get entry
+    def get_entry(self, key):
+        with self.lock:
+            return self.entries.get(key)
+
+    # set entry
+    def set_entry(self, key, data, last_update, views=None):
+        with self.lock:
+            self.entries[key] = {'data': data, 'lastUpdate': last_update, 'checkTime': time.time(),
+                                 'views': views}
+
+    # register a function to make views for a main key
+    def register_view_builder(self, main_key, builder):
+        with self.lock:
+            self.viewBuilders[main_key] = builder
+
+    # make views for data. None if no builder is registered for the main key
+    def build_views(self, main_key, data):
+        with self.lock:
+            builder = self.viewBuilders.get(main_key)
+        if builder is None or data is None:
+            return None
+        return builder(data)
+
+    # get views of entry. Views are made when missing, i.e. the builder was registered after loading
+    def get_views(self, key, main_key):
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry['views'] is None:
+            views = self.build_views(main_key, entry['data'])
+            with self.lock:
+                # skip if the entry was replaced in the meantime
+                if self.entries.get(key) is entry:
+                    entry['views'] = views
+            return views
+        return entry['views']
+
+    # mark entry as checked
+    def touch_entry(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries[key]['checkTime'] = time.time()
+
+    # increment counter
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    # get counters
+    def get_stats(self, reset=False):
+        with self.lock:
+            retVal = dict(self.stats)
+            if reset:
+                for name in self.stats:
+                    self.stats[name] = 0
+        return retVal
+
+
+# CE flavours which can be used by submitters
+_ce_flavours = set(['arc-ce', 'cream-ce', 'htcondor-ce'])
+
+
+# make pre-parsed views of panda_queues.json, which are made once per refresh of the cache.
+# Views except queueDict are keyed by PanDA Queue name
+def make_panda_queues_views(panda_queues_dict):
+    views = {
+        # PanDA Resource name -> queue dict
+        'queueDict': dict(),
+        # PanDA Resource name -> PanDA Queue name
+        'queueName': dict(),
+        'status': dict(),
+        # CE endpoint -> CE dict, only for active CEs of supported flavours
+        'activeCEs': dict(),
+        'corecount': dict(),
+        'pilotVersion': dict(),
+        'capability': dict(),
+        }
+    if not isinstance(panda_queues_dict, dict):
+        return views
+    for (k, v) in iteritems(panda_queues_dict):
+        if not isinstance(v, dict):
+            continue
+        try:
+            panda_resource = v['panda_resource']
+            assert k == v['nickname']
+        except Exception:
+            pass
+        else:
+            views['queueDict'][panda_resource] = v
+            views['queueName'][panda_resource] = k
+        views['status'][k] = v.get('status')
+        views['corecount'][k] = v.get('corecount') if v.get('corecount') else 1
+        views['pilotVersion'][k] = str(v.get('pilot_version', ''))
+        views['capability'][k] = v.get('capability', '')
+        # active CEs
+        ce_dict = dict()
+        for ce_queue_dict in v.get('queues', []):
+            if not (ce_queue_dict.get('ce_endpoint')
+                    and str(ce_queue_dict.get('ce_state', '')).upper() == 'ACTIVE'
+                    and str(ce_queue_dict.get('ce_flavour', '')).lower() in _ce_flavours):
+                continue
+            ce_endpoint = ce_queue_dict.get('ce_endpoint')
+            if ce_endpoint in ce_dict \
+                    and str(ce_queue_dict.get('ce_queue_name', '')).lower() == 'default':
+                pass
+            else:
+                ce_dict[ce_endpoint] = ce_queue_dict
+        views['activeCEs'][k] = ce_dict
+    return views
+
+
+# cache store for all threads
+cache_store = CacheStore()
+cache_store.register_view_builder('panda_queues.json', make_panda_queues_views)
+
+
+# get cache store
+def get_cache_store():
+    return cache_store
+
+
 # get file lock
 @contextmanager
 def get_file_lock(file_name, lock_interval):
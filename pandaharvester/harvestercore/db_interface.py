@@ -19,6 +19,10 @@ class DBInterface(object):
     def get_cache(self, data_name):
         return self.dbProxy.get_cache(data_name)
 
+    # get pre-parsed views of cache data
+    def get_cache_views(self, data_name):
+        return self.dbProxy.get_cache_views(data_name)
+
     # get files with a group ID
     def get_files_with_group_id(self, group_id):
         return self.dbProxy.get_files_with_group_id(group_id)
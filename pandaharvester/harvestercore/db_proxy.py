@@ -7,11 +7,13 @@ import os
 import re
 import sys
 import copy
+import uuid
 import random
 import inspect
 import time
 import datetime
 import threading
+from collections import OrderedDict
 from future.utils import iteritems
 
 from .command_spec import CommandSpec
@@ -49,15 +51,81 @@ diagTableName = 'diag_table'
 queueConfigDumpTableName = 'qcdump_table'
 serviceMetricsTableName = 'sm_table'
 
+# max number of bind variables in an IN-list
+maxInListSize = 500
+
 # connection lock
 conLock = threading.Lock()
 
+# cache of compiled SQL statements; (engine, raw SQL) -> (need lock, converted SQL, placeholders)
+sqlCache = OrderedDict()
+sqlCacheLock = threading.Lock()
+try:
+    sqlCacheSize = harvester_config.db.sqlCacheSize
+except AttributeError:
+    sqlCacheSize = 1000
+
+
+# compile SQL statement to get the flag for application side lock, SQL converted for the engine,
+# and the ordered list of placeholders
+def compile_sql(sql):
+    engine = harvester_config.db.engine
+    key = (engine, sql)
+    with sqlCacheLock:
+        if key in sqlCache:
+            sqlCache[key] = tmpVal = sqlCache.pop(key)
+            return tmpVal
+    # lock database if application side lock is used
+    needLock = re.search('^INSERT', sql, re.I) is not None \
+        or re.search('^UPDATE', sql, re.I) is not None \
+        or re.search(' FOR UPDATE', sql, re.I) is not None \
+        or re.search('^DELETE', sql, re.I) is not None
+    # remove FOR UPDATE for sqlite
+    newSQL = sql
+    if engine == 'sqlite':
+        newSQL = re.sub(' FOR UPDATE', ' ', newSQL, re.I)
+        newSQL = re.sub('INSERT IGNORE', 'INSERT OR IGNORE', newSQL, re.I)
+    else:
+        newSQL = re.sub('INSERT OR IGNORE', 'INSERT IGNORE', newSQL, re.I)
+    # extract placeholders
+    items = tuple(re.findall(':[^ $,)]+', newSQL))
+    # using the printf style syntax for mariaDB
+    if engine == 'mariadb':
+        newSQL = re.sub(':[^ $,)]+', '%s', newSQL)
+    tmpVal = (needLock, newSQL, items)
+    with sqlCacheLock:
+        sqlCache[key] = tmpVal
+        while len(sqlCache) > sqlCacheSize:
+            sqlCache.popitem(last=False)
+    return tmpVal
+
+
+# bind parameters to placeholders
+def bind_params(items, varmap):
+    try:
+        return tuple([varmap[item] for item in items])
+    except KeyError:
+        for item in items:
+            if item not in varmap:
+                raise KeyError('{0} is missing in SQL parameters'.format(item))
+        raise
+
+
+# make an IN-list expression and the corresponding bind variables
+def make_in_list_expression(values, prefix):
+    varMap = dict()
+    for tmpIdx, tmpValue in enumerate(values):
+        varMap[':{0}{1}'.format(prefix, tmpIdx)] = tmpValue
+    return ','.join(varMap.keys()), varMap
+
 
 # connection class
 class DBProxy(object):
     # constructor
-    def __init__(self, thr_name=None, read_only=False):
+    def __init__(self, thr_name=None, read_only=False, query_only=False):
         self.thrName = thr_name
+        self.readOnly = read_only
+        self.queryOnly = query_only
         self.verbLog = None
         self.useInspect = False
         if harvester_config.db.verbose:
@@ -77,6 +145,10 @@ class DBProxy(object):
                 port = harvester_config.db.port
             else:
                 port = 3306
+            # use replica for read-only session if available
+            if query_only and getattr(harvester_config.db, 'replicaHost', None):
+                host = harvester_config.db.replicaHost
+                port = getattr(harvester_config.db, 'replicaPort', port)
             if hasattr(harvester_config.db, 'useMySQLdb') and harvester_config.db.useMySQLdb is True:
                 import MySQLdb
                 import MySQLdb.cursors
@@ -111,6 +183,9 @@ class DBProxy(object):
                 self.con = mysql.connector.connect(user=harvester_config.db.user, passwd=harvester_config.db.password,
                                                    db=harvester_config.db.schema, host=host, port=port)
                 self.cur = self.con.cursor(named_tuple=True, buffered=True)
+            # read-only session
+            if query_only:
+                self.cur.execute('SET SESSION TRANSACTION READ ONLY')
         else:
             import sqlite3
             if read_only:
@@ -131,9 +206,13 @@ class DBProxy(object):
                 self.cur.execute('PRAGMA journal_mode = WAL')
                 # read to avoid database lock
                 self.cur.fetchone()
+            # reject writes
+            if query_only:
+                self.cur.execute('PRAGMA query_only = ON')
         self.lockDB = False
-        # using application side lock if DB doesn't have a mechanism for exclusive access
-        if harvester_config.db.engine == 'mariadb':
+        # using application side lock if DB doesn't have a mechanism for exclusive access. Not for
+        # query-only connections since readers don't block the writer with WAL
+        if harvester_config.db.engine == 'mariadb' or query_only:
             self.usingAppLock = False
         else:
             self.usingAppLock = True
@@ -157,7 +236,8 @@ class DBProxy(object):
                 try_timestamp = time.time()
                 while time.time() - try_timestamp < retry_time:
                     try:
-                        self.__init__()
+                        self.__init__(thr_name=self.thrName, read_only=self.readOnly,
+                                      query_only=self.queryOnly)
                         tmpLog.info('renewed connection')
                         break
                     except Exception as e:
@@ -166,38 +246,14 @@ class DBProxy(object):
 
     # convert param dict to list
     def convert_params(self, sql, varmap):
+        needLock, newSQL, items = compile_sql(sql)
         # lock database if application side lock is used
-        if self.usingAppLock and \
-                (re.search('^INSERT', sql, re.I) is not None
-                 or re.search('^UPDATE', sql, re.I) is not None
-                 or re.search(' FOR UPDATE', sql, re.I) is not None
-                 or re.search('^DELETE', sql, re.I) is not None
-                 ):
-                self.lockDB = True
-        # remove FOR UPDATE for sqlite
-        if harvester_config.db.engine == 'sqlite':
-            sql = re.sub(' FOR UPDATE', ' ', sql, re.I)
-            sql = re.sub('INSERT IGNORE', 'INSERT OR IGNORE', sql, re.I)
-        else:
-            sql = re.sub('INSERT OR IGNORE', 'INSERT IGNORE', sql, re.I)
+        if self.usingAppLock and needLock:
+            self.lockDB = True
         # no conversation unless dict
         if not isinstance(varmap, dict):
-            # using the printf style syntax for mariaDB
-            if harvester_config.db.engine == 'mariadb':
-                sql = re.sub(':[^ $,)]+', '%s', sql)
-            return sql, varmap
-        paramList = []
-        # extract placeholders
-        items = re.findall(':[^ $,)]+', sql)
-        for item in items:
-            if item not in varmap:
-                raise KeyError('{0} is missing in SQL parameters'.format(item))
-            if item not in paramList:
-                paramList.append(varmap[item])
-        # using the printf style syntax for mariaDB
-        if harvester_config.db.engine == 'mariadb':
-            sql = re.sub(':[^ $,)]+', '%s', sql)
-        return sql, paramList
+            return newSQL, varmap
+        return newSQL, bind_params(items, varmap)
 
     # wrapper for execute
     def execute(self, sql, varmap=None):
@@ -262,13 +318,17 @@ class DBProxy(object):
                                                                                  inspect.stack()[1][3],
                                                                                  self.thrName))
             # convert param dict
+            needLock, newSQL, items = compile_sql(sql)
+            if self.usingAppLock and needLock:
+                self.lockDB = True
             paramList = []
-            newSQL = sql
             for varMap in varmap_list:
                 if varMap is None:
                     varMap = dict()
-                newSQL, params = self.convert_params(sql, varMap)
-                paramList.append(params)
+                if isinstance(varMap, dict):
+                    paramList.append(bind_params(items, varMap))
+                else:
+                    paramList.append(varMap)
             # execute
             try:
                 if harvester_config.db.engine == 'sqlite':
@@ -361,6 +421,32 @@ class DBProxy(object):
                 isUnique = True
         return isIndex, isUnique
 
+    # get name, columns, and uniqueness of a composite index
+    def get_composite_index(self, attr, table_name):
+        columns = [column.strip() for column in attr.split('/')[0].split(',')]
+        isIndex, isUnique = self.need_index(attr)
+        indexName = 'idx_{0}_{1}'.format('_'.join(columns), table_name)
+        return indexName, columns, isUnique
+
+    # get names of indexes in a table
+    def get_index_names(self, table_name):
+        varMap = dict()
+        varMap[':name'] = table_name
+        if harvester_config.db.engine == 'mariadb':
+            varMap[':schema'] = harvester_config.db.schema
+            sqlI = 'SELECT DISTINCT index_name FROM information_schema.statistics '
+            sqlI += 'WHERE table_schema=:schema AND table_name=:name '
+        else:
+            varMap[':type'] = 'index'
+            sqlI = 'SELECT name FROM sqlite_master WHERE type=:type AND tbl_name=:name '
+        self.execute(sqlI, varMap)
+        resI = self.cur.fetchall()
+        self.commit()
+        indexNames = set()
+        for indexName, in resI:
+            indexNames.add(indexName)
+        return indexNames
+
     # make table
     def make_table(self, cls, table_name):
         try:
@@ -445,6 +531,26 @@ class DBProxy(object):
                     tmpLog.debug('added {0}'.format(indexName))
                 except Exception:
                     core_utils.dump_error_message(tmpLog)
+            # make composite indexes
+            if len(cls.indexes) > 0:
+                existingIndexes = self.get_index_names(table_name)
+                for attr in cls.indexes:
+                    indexName, columns, isUnique = self.get_composite_index(attr, table_name)
+                    if indexName in existingIndexes:
+                        continue
+                    if isUnique:
+                        sqlI = "CREATE UNIQUE INDEX "
+                    else:
+                        sqlI = "CREATE INDEX "
+                    sqlI += "{0} ON {1}({2}) ".format(indexName, table_name, ','.join(columns))
+                    try:
+                        self.execute(sqlI)
+                        # commit
+                        self.commit()
+                        tmpLog.debug('added {0}'.format(indexName))
+                    except Exception:
+                        self.rollback()
+                        core_utils.dump_error_message(tmpLog)
         except Exception:
             # roll back
             self.rollback()
@@ -518,10 +624,21 @@ class DBProxy(object):
                 else:
                     attrType = self.type_conversion(attrType)
                     outStrs.append('{0} {1} is missing in {2}'.format(attrName, attrType, table_name))
+        # check composite indexes, which are not mandatory
+        if not get_missing and len(cls.indexes) > 0:
+            existingIndexes = self.get_index_names(table_name)
+            for attr in cls.indexes:
+                indexName, columns, isUnique = self.get_composite_index(attr, table_name)
+                if indexName not in existingIndexes:
+                    tmpLog = core_utils.make_logger(_logger, method_name='check_table')
+                    tmpLog.warning('{0} on ({1}) is missing in {2}'.format(indexName, ','.join(columns),
+                                                                          table_name))
         return outStrs
 
     # insert jobs
-    def insert_jobs(self, jobspec_list):
+    def insert_jobs(self, jobspec_list, bulk_mode=False, use_upsert=False):
+        if bulk_mode:
+            return self.insert_jobs_bulk(jobspec_list, use_upsert)
         # get logger
         tmpLog = core_utils.make_logger(_logger, method_name='insert_jobs')
         tmpLog.debug('{0} jobs'.format(len(jobspec_list)))
@@ -583,6 +700,77 @@ class DBProxy(object):
             # return
             return False
 
+    # insert jobs in a single transaction
+    def insert_jobs_bulk(self, jobspec_list, use_upsert=False):
+        # get logger
+        tmpLog = core_utils.make_logger(_logger, method_name='insert_jobs_bulk')
+        tmpLog.debug('{0} jobs upsert={1}'.format(len(jobspec_list), use_upsert))
+        try:
+            # sql to insert jobs
+            if not use_upsert:
+                sqlJ = "INSERT INTO {0} ({1}) ".format(jobTableName, JobSpec.column_names())
+                sqlJ += JobSpec.bind_values_expression()
+            elif harvester_config.db.engine == 'mariadb':
+                sqlJ = "INSERT INTO {0} ({1}) ".format(jobTableName, JobSpec.column_names())
+                sqlJ += JobSpec.bind_values_expression()
+                sqlJ += " ON DUPLICATE KEY UPDATE "
+                sqlJ += ','.join(['{0}=VALUES({0})'.format(attr) for attr in JobSpec.column_names().split(',')])
+            else:
+                sqlJ = "INSERT OR REPLACE INTO {0} ({1}) ".format(jobTableName, JobSpec.column_names())
+                sqlJ += JobSpec.bind_values_expression()
+            # sql to insert files
+            sqlF = "INSERT INTO {0} ({1}) ".format(fileTableName, FileSpec.column_names())
+            sqlF += FileSpec.bind_values_expression()
+            # sql to get existing jobs
+            sqlCJ = "SELECT PandaID FROM {0} ".format(jobTableName)
+            sqlCJ += "WHERE PandaID IN ({0}) "
+            # sql to delete jobs, files, events, and relations
+            sqlDList = []
+            for tableName in [jobTableName, fileTableName, eventTableName, jobWorkerTableName]:
+                # jobs are overwritten with upsert
+                if use_upsert and tableName == jobTableName:
+                    continue
+                sqlD = "DELETE FROM {0} ".format(tableName)
+                sqlD += "WHERE PandaID IN ({0}) "
+                sqlDList.append(sqlD)
+            # delete old records of jobs just in case
+            pandaIDs = list(set([jobSpec.PandaID for jobSpec in jobspec_list]))
+            nDel = 0
+            for idChunk in core_utils.create_shards(pandaIDs, maxInListSize):
+                inExpr, varMap = make_in_list_expression(idChunk, 'PandaID')
+                self.execute(sqlCJ.format(inExpr), varMap)
+                resCJ = self.cur.fetchall()
+                existingIDs = [pandaID for pandaID, in resCJ]
+                if len(existingIDs) == 0:
+                    continue
+                nDel += len(existingIDs)
+                inExpr, varMap = make_in_list_expression(existingIDs, 'PandaID')
+                for sqlD in sqlDList:
+                    self.execute(sqlD.format(inExpr), varMap)
+            # insert jobs and files
+            varMapsJ = []
+            varMapsF = []
+            for jobSpec in jobspec_list:
+                varMapsJ.append(jobSpec.values_list())
+                for fileSpec in jobSpec.inFiles:
+                    varMapsF.append(fileSpec.values_list())
+            self.executemany(sqlJ, varMapsJ)
+            self.executemany(sqlF, varMapsF)
+            # commit
+            self.commit()
+            tmpLog.debug('inserted {0} jobs and {1} files after deleting {2} old jobs'.format(len(varMapsJ),
+                                                                                             len(varMapsF),
+                                                                                             nDel))
+            # return
+            return True
+        except Exception:
+            # roll back
+            self.rollback()
+            # dump error
+            core_utils.dump_error_message(tmpLog)
+            # return
+            return False
+
     # get job
     def get_job(self, panda_id):
         try:
@@ -732,6 +920,123 @@ class DBProxy(object):
             # return
             return None
 
+    # update jobs in bulk
+    def update_jobs_bulk(self, jobspec_list, criteria=None, update_in_file=False):
+        try:
+            # get logger
+            tmpLog = core_utils.make_logger(_logger, method_name='update_jobs_bulk')
+            tmpLog.debug('start for {0} jobs'.format(len(jobspec_list)))
+            if criteria is None:
+                criteria = {}
+            # sql to get jobs matching criteria
+            sqlC = "SELECT PandaID FROM {0} ".format(jobTableName)
+            sqlC += "WHERE PandaID IN ({0}) "
+            sqlCR = ""
+            varMapCR = dict()
+            for tmpKey, tmpVal in iteritems(criteria):
+                mapKey = ':{0}_cr'.format(tmpKey)
+                sqlCR += "AND {0}={1} ".format(tmpKey, mapKey)
+                varMapCR[mapKey] = tmpVal
+            sqlC += sqlCR
+            sqlC += "FOR UPDATE "
+            # sql to set file status to done if jobs are done
+            sqlFD = "UPDATE {0} SET status=:status ".format(fileTableName)
+            sqlFD += "WHERE PandaID=:PandaID AND fileType IN (:type1,:type2) "
+            # sql to set to_delete flag
+            sqlD = "UPDATE {0} SET todelete=:to_delete ".format(fileTableName)
+            sqlD += "WHERE PandaID=:PandaID "
+            # get jobs to update
+            pandaIDs = [jobSpec.PandaID for jobSpec in jobspec_list if jobSpec.has_updated_attributes()]
+            matchedIDs = set()
+            for idChunk in core_utils.create_shards(pandaIDs, maxInListSize):
+                inExpr, varMap = make_in_list_expression(idChunk, 'PandaID')
+                varMap.update(varMapCR)
+                self.execute(sqlC.format(inExpr), varMap)
+                for pandaID, in self.cur.fetchall():
+                    matchedIDs.add(pandaID)
+            # group jobs by changed attributes
+            jobGroups = dict()
+            eventGroups = dict()
+            fileGroups = dict()
+            varMapsFD = []
+            varMapsD = []
+            retList = []
+            for jobSpec in jobspec_list:
+                if not jobSpec.has_updated_attributes():
+                    retList.append(None)
+                    continue
+                if jobSpec.PandaID not in matchedIDs:
+                    retList.append(0)
+                    continue
+                retList.append(1)
+                varMap = jobSpec.values_map(only_changed=True)
+                varMap.update(varMapCR)
+                varMap[':PandaID'] = jobSpec.PandaID
+                jobGroups.setdefault(jobSpec.bind_update_changes_expression(), []).append(varMap)
+                # update events
+                for eventSpec in jobSpec.events:
+                    varMap = eventSpec.values_map(only_changed=True)
+                    if varMap != {}:
+                        varMap[':eventRangeID'] = eventSpec.eventRangeID
+                        eventGroups.setdefault(eventSpec.bind_update_changes_expression(), []).append(varMap)
+                # update input file
+                if update_in_file:
+                    for fileSpec in jobSpec.inFiles:
+                        varMap = fileSpec.values_map(only_changed=True)
+                        if varMap != {}:
+                            varMap[':fileID'] = fileSpec.fileID
+                            fileGroups.setdefault(fileSpec.bind_update_changes_expression(), []).append(varMap)
+                elif jobSpec.is_final_status():
+                    # set file status to done if jobs are done
+                    varMap = dict()
+                    varMap[':PandaID'] = jobSpec.PandaID
+                    varMap[':type1'] = 'input'
+                    varMap[':type2'] = FileSpec.AUX_INPUT
+                    varMap[':status'] = 'done'
+                    varMapsFD.append(varMap)
+                # set to_delete flag
+                if jobSpec.subStatus == 'done':
+                    varMap = dict()
+                    varMap[':PandaID'] = jobSpec.PandaID
+                    varMap[':to_delete'] = 1
+                    varMapsD.append(varMap)
+            # update jobs
+            nStatements = 0
+            for updateExpr, varMaps in iteritems(jobGroups):
+                sql = "UPDATE {0} SET {1} ".format(jobTableName, updateExpr)
+                sql += "WHERE PandaID=:PandaID "
+                sql += sqlCR
+                self.executemany(sql, varMaps)
+                nStatements += 1
+            # update events
+            for updateExpr, varMaps in iteritems(eventGroups):
+                sqlE = "UPDATE {0} SET {1} ".format(eventTableName, updateExpr)
+                sqlE += "WHERE eventRangeID=:eventRangeID "
+                self.executemany(sqlE, varMaps)
+                nStatements += 1
+            # update input files
+            for updateExpr, varMaps in iteritems(fileGroups):
+                sqlF = "UPDATE {0} SET {1} ".format(fileTableName, updateExpr)
+                sqlF += "WHERE fileID=:fileID "
+                self.executemany(sqlF, varMaps)
+                nStatements += 1
+            for sqlX, varMaps in [(sqlFD, varMapsFD), (sqlD, varMapsD)]:
+                if len(varMaps) > 0:
+                    self.executemany(sqlX, varMaps)
+                    nStatements += 1
+            # commit
+            self.commit()
+            tmpLog.debug('updated {0} jobs with {1} statements'.format(len(matchedIDs), nStatements))
+            # return
+            return retList
+        except Exception:
+            # roll back
+            self.rollback()
+            # dump error
+            core_utils.dump_error_message(_logger)
+            # return
+            return None
+
     # insert output files into database
     def insert_files(self,jobspec_list):
         # get logger
@@ -799,6 +1104,68 @@ class DBProxy(object):
             # return
             return None
 
+    # update workers in bulk
+    def update_workers_bulk(self, workspec_list, criteria=None):
+        try:
+            # get logger
+            tmpLog = core_utils.make_logger(_logger, method_name='update_workers_bulk')
+            tmpLog.debug('start for {0} workers'.format(len(workspec_list)))
+            if criteria is None:
+                criteria = {}
+            # sql to get workers matching criteria
+            sqlC = "SELECT workerID FROM {0} ".format(workTableName)
+            sqlC += "WHERE workerID IN ({0}) "
+            sqlCR = ""
+            varMapCR = dict()
+            for tmpKey, tmpVal in iteritems(criteria):
+                mapKey = ':{0}_cr'.format(tmpKey)
+                sqlCR += "AND {0}={1} ".format(tmpKey, mapKey)
+                varMapCR[mapKey] = tmpVal
+            sqlC += sqlCR
+            sqlC += "FOR UPDATE "
+            # get workers to update
+            workerIDs = [workSpec.workerID for workSpec in workspec_list if workSpec.has_updated_attributes()]
+            matchedIDs = set()
+            for idChunk in core_utils.create_shards(workerIDs, maxInListSize):
+                inExpr, varMap = make_in_list_expression(idChunk, 'workerID')
+                varMap.update(varMapCR)
+                self.execute(sqlC.format(inExpr), varMap)
+                for workerID, in self.cur.fetchall():
+                    matchedIDs.add(workerID)
+            # group workers by changed attributes
+            workerGroups = dict()
+            retList = []
+            for workSpec in workspec_list:
+                if not workSpec.has_updated_attributes():
+                    retList.append(None)
+                    continue
+                if workSpec.workerID not in matchedIDs:
+                    retList.append(0)
+                    continue
+                retList.append(1)
+                varMap = workSpec.values_map(only_changed=True)
+                varMap.update(varMapCR)
+                varMap[':workerID'] = workSpec.workerID
+                workerGroups.setdefault(workSpec.bind_update_changes_expression(), []).append(varMap)
+            # update workers
+            for updateExpr, varMaps in iteritems(workerGroups):
+                sql = "UPDATE {0} SET {1} ".format(workTableName, updateExpr)
+                sql += "WHERE workerID=:workerID "
+                sql += sqlCR
+                self.executemany(sql, varMaps)
+            # commit
+            self.commit()
+            tmpLog.debug('updated {0} workers with {1} statements'.format(len(matchedIDs), len(workerGroups)))
+            # return
+            return retList
+        except Exception:
+            # roll back
+            self.rollback()
+            # dump error
+            core_utils.dump_error_message(_logger)
+            # return
+            return None
+
     # fill panda queue table
     def fill_panda_queue_table(self, panda_queue_list, queue_config_mapper):
         try:
@@ -1715,7 +2082,9 @@ class DBProxy(object):
             return []
 
     # get workers to monitor
-    def get_workers_to_update(self, max_workers, check_interval, lock_interval, locked_by):
+    def get_workers_to_update(self, max_workers, check_interval, lock_interval, locked_by, bulk_mode=False):
+        if bulk_mode:
+            return self.get_workers_to_update_bulk(max_workers, check_interval, lock_interval, locked_by)
         try:
             # get logger
             tmpLog = core_utils.make_logger(_logger, method_name='get_workers_to_update')
@@ -1864,6 +2233,205 @@ class DBProxy(object):
             # return
             return {}
 
+    # get workers to monitor with set-based locking
+    def get_workers_to_update_bulk(self, max_workers, check_interval, lock_interval, locked_by):
+        try:
+            # get logger
+            tmpLog = core_utils.make_logger(_logger, method_name='get_workers_to_update_bulk')
+            tmpLog.debug('start')
+            useSkipLocked = harvester_config.db.engine == 'mariadb' \
+                and getattr(harvester_config.db, 'useSkipLocked', False)
+            # sql to get workers
+            sqlW = "SELECT workerID,configID,mapType FROM {0} ".format(workTableName)
+            sqlW += "WHERE status IN (:st_submitted,:st_running,:st_idle) "
+            sqlW += "AND ((modificationTime<:lockTimeLimit AND lockedBy IS NOT NULL) "
+            sqlW += "OR (modificationTime<:checkTimeLimit AND lockedBy IS NULL)) "
+            sqlW += "ORDER BY modificationTime LIMIT {0} ".format(max_workers)
+            # condition to lock workers with time check
+            sqlCond = "AND status IN (:st_submitted,:st_running,:st_idle) "
+            sqlCond += "AND ((modificationTime<:lockTimeLimit AND lockedBy IS NOT NULL) "
+            sqlCond += "OR (modificationTime<:checkTimeLimit AND lockedBy IS NULL)) "
+            # sql to get associated workerIDs
+            sqlA = "SELECT s.workerID,t.workerID FROM {0} t, {0} s, {1} w ".format(jobWorkerTableName, workTableName)
+            sqlA += "WHERE s.PandaID=t.PandaID AND s.workerID IN ({0}) "
+            sqlA += "AND w.workerID=t.workerID AND w.status IN (:st_submitted,:st_running,:st_idle) "
+            # sql to update modificationTime
+            sqlLM = "UPDATE {0} SET modificationTime=:timeNow ".format(workTableName)
+            sqlLM += "WHERE workerID IN ({0}) "
+            # sql to claim workers with a token
+            sqlLC = "UPDATE {0} SET modificationTime=:timeNow,lockedBy=:claimToken ".format(workTableName)
+            sqlLC += "WHERE workerID IN ({0}) " + sqlCond
+            # sql to get claimed workers
+            sqlC = "SELECT workerID FROM {0} ".format(workTableName)
+            sqlC += "WHERE workerID IN ({0}) AND lockedBy=:claimToken "
+            # sql to get lockable workers with row locks
+            sqlS = "SELECT workerID FROM {0} ".format(workTableName)
+            sqlS += "WHERE workerID IN ({0}) " + sqlCond
+            sqlS += "FOR UPDATE SKIP LOCKED "
+            # sql to lock workers without time check
+            sqlL = "UPDATE {0} SET modificationTime=:timeNow,lockedBy=:lockedBy ".format(workTableName)
+            sqlL += "WHERE workerID IN ({0}) "
+            # sql to get workers
+            sqlG = "SELECT {0} FROM {1} ".format(WorkSpec.column_names(), workTableName)
+            sqlG += "WHERE workerID IN ({0}) "
+            # sql to get associated PandaIDs
+            sqlP = "SELECT workerID,PandaID FROM {0} ".format(jobWorkerTableName)
+            sqlP += "WHERE workerID IN ({0}) "
+            # get workerIDs
+            timeNow = datetime.datetime.utcnow()
+            lockTimeLimit = timeNow - datetime.timedelta(seconds=lock_interval)
+            checkTimeLimit = timeNow - datetime.timedelta(seconds=check_interval)
+            varMapSt = dict()
+            varMapSt[':st_submitted'] = WorkSpec.ST_submitted
+            varMapSt[':st_running'] = WorkSpec.ST_running
+            varMapSt[':st_idle'] = WorkSpec.ST_idle
+            varMapTime = dict()
+            varMapTime[':lockTimeLimit'] = lockTimeLimit
+            varMapTime[':checkTimeLimit'] = checkTimeLimit
+            varMap = dict()
+            varMap.update(varMapSt)
+            varMap.update(varMapTime)
+            self.execute(sqlW, varMap)
+            resW = self.cur.fetchall()
+            tmpWorkers = []
+            workerAttrs = dict()
+            for workerID, configID, mapType in resW:
+                # ignore configID
+                if not core_utils.dynamic_plugin_change():
+                    configID = None
+                if workerID in workerAttrs:
+                    continue
+                workerAttrs[workerID] = (configID, mapType)
+                tmpWorkers.append(workerID)
+            # get associated workerIDs
+            workerIDtoScanMap = dict()
+            for workerID in tmpWorkers:
+                # add original ID just in case since no relation when job is not yet bound
+                workerIDtoScanMap[workerID] = set([workerID])
+            for idChunk in core_utils.create_shards(tmpWorkers, maxInListSize):
+                inExpr, varMap = make_in_list_expression(idChunk, 'workerID')
+                varMap.update(varMapSt)
+                self.execute(sqlA.format(inExpr), varMap)
+                resA = self.cur.fetchall()
+                for workerID, tmpWorkID in resA:
+                    workerIDtoScanMap[workerID].add(tmpWorkID)
+            # use only the largest worker to avoid updating the same worker set concurrently
+            idsToTouch = []
+            idsToLock = []
+            for workerID in tmpWorkers:
+                configID, mapType = workerAttrs[workerID]
+                if mapType == WorkSpec.MT_MultiWorkers and workerID != min(workerIDtoScanMap[workerID]):
+                    idsToTouch.append(workerID)
+                else:
+                    idsToLock.append(workerID)
+            # update modification time
+            for idChunk in core_utils.create_shards(idsToTouch, maxInListSize):
+                inExpr, varMap = make_in_list_expression(idChunk, 'workerID')
+                varMap[':timeNow'] = timeNow
+                self.execute(sqlLM.format(inExpr), varMap)
+            self.commit()
+            # lock workers with time check
+            claimedIDs = set()
+            claimToken = '{0}:{1}'.format(locked_by, uuid.uuid4().hex)
+            for idChunk in core_utils.create_shards(idsToLock, maxInListSize):
+                inExpr, varMap = make_in_list_expression(idChunk, 'workerID')
+                if useSkipLocked:
+                    varMap.update(varMapSt)
+                    varMap.update(varMapTime)
+                    self.execute(sqlS.format(inExpr), varMap)
+                    resS = self.cur.fetchall()
+                    tmpIDs = [tmpWorkID for tmpWorkID, in resS]
+                    if len(tmpIDs) > 0:
+                        inExprS, varMap = make_in_list_expression(tmpIDs, 'workerID')
+                        varMap[':timeNow'] = timeNow
+                        varMap[':lockedBy'] = locked_by
+                        self.execute(sqlL.format(inExprS), varMap)
+                    claimedIDs.update(tmpIDs)
+                else:
+                    varMap[':timeNow'] = timeNow
+                    varMap[':claimToken'] = claimToken
+                    varMap.update(varMapSt)
+                    varMap.update(varMapTime)
+                    self.execute(sqlLC.format(inExpr), varMap)
+                    if self.cur.rowcount > 0:
+                        inExpr, varMap = make_in_list_expression(idChunk, 'workerID')
+                        varMap[':claimToken'] = claimToken
+                        self.execute(sqlC.format(inExpr), varMap)
+                        resC = self.cur.fetchall()
+                        for tmpWorkID, in resC:
+                            claimedIDs.add(tmpWorkID)
+                # commit
+                self.commit()
+            # make worker sets
+            checkedIDs = set()
+            workerSets = []
+            for workerID in idsToLock:
+                # skip if not locked or already checked
+                if workerID not in claimedIDs or workerID in checkedIDs:
+                    continue
+                configID, mapType = workerAttrs[workerID]
+                workerIDtoScan = workerIDtoScanMap[workerID]
+                checkedIDs.update(workerIDtoScan)
+                workerSets.append((configID, workerIDtoScan))
+            # lock associated workers, and rename the claim token for the locked ones
+            allIDs = list(checkedIDs)
+            for idChunk in core_utils.create_shards(allIDs, maxInListSize):
+                inExpr, varMap = make_in_list_expression(idChunk, 'workerID')
+                varMap[':timeNow'] = timeNow
+                varMap[':lockedBy'] = locked_by
+                self.execute(sqlL.format(inExpr), varMap)
+            # get workers
+            workSpecMap = dict()
+            for idChunk in core_utils.create_shards(allIDs, maxInListSize):
+                inExpr, varMap = make_in_list_expression(idChunk, 'workerID')
+                self.execute(sqlG.format(inExpr), varMap)
+                resG = self.cur.fetchall()
+                for tmpRes in resG:
+                    workSpec = WorkSpec()
+                    workSpec.pack(tmpRes)
+                    workSpec.pandaid_list = []
+                    workSpec.lockedBy = locked_by
+                    workSpec.force_not_update('lockedBy')
+                    workSpecMap[workSpec.workerID] = workSpec
+            # get associated PandaIDs
+            for idChunk in core_utils.create_shards(allIDs, maxInListSize):
+                inExpr, varMap = make_in_list_expression(idChunk, 'workerID')
+                self.execute(sqlP.format(inExpr), varMap)
+                resP = self.cur.fetchall()
+                for tmpWorkID, tmpPandaID in resP:
+                    if tmpWorkID in workSpecMap:
+                        workSpecMap[tmpWorkID].pandaid_list.append(tmpPandaID)
+            # commit
+            self.commit()
+            # make return
+            retVal = {}
+            for configID, workerIDtoScan in workerSets:
+                queueName = None
+                workersList = []
+                for tmpWorkID in workerIDtoScan:
+                    if tmpWorkID not in workSpecMap:
+                        continue
+                    workSpec = workSpecMap[tmpWorkID]
+                    if queueName is None:
+                        queueName = workSpec.computingSite
+                    if len(workSpec.pandaid_list) > 0:
+                        workSpec.nJobs = len(workSpec.pandaid_list)
+                    workersList.append(workSpec)
+                # add
+                if queueName is not None:
+                    retVal.setdefault(queueName, dict())
+                    retVal[queueName].setdefault(configID, [])
+                    retVal[queueName][configID].append(workersList)
+            tmpLog.debug('got {0} worker sets out of {1} candidates'.format(len(workerSets), len(tmpWorkers)))
+            return retVal
+        except Exception:
+            # roll back
+            self.rollback()
+            # dump error
+            core_utils.dump_error_message(_logger)
+            # return
+            return {}
+
     # get workers to propagate
     def get_workers_to_propagate(self, max_workers, check_interval):
         try:
@@ -2983,9 +3551,10 @@ class DBProxy(object):
             # get logger
             tmpLog = core_utils.make_logger(_logger, 'mainKey={0} subKey={1}'.format(main_key, sub_key),
                                             method_name='refresh_cache')
-            # make spec
+            # make spec. lastUpdate is truncated to sec since timestamp columns of MariaDB don't keep
+            # microseconds and otherwise the probe in get_cache never matches the local copy
             cacheSpec = CacheSpec()
-            cacheSpec.lastUpdate = datetime.datetime.utcnow()
+            cacheSpec.lastUpdate = datetime.datetime.utcnow().replace(microsecond=0)
             cacheSpec.data = new_info
             # check if already there
             varMap = dict()
@@ -3015,12 +3584,11 @@ class DBProxy(object):
             self.execute(sqlU, varMap)
             # commit
             self.commit()
-            # put into global dict
+            # put into cache store together with views
             cacheKey = 'cache|{0}|{1}'.format(main_key, sub_key)
-            globalDict = core_utils.get_global_dict()
-            globalDict.acquire()
-            globalDict[cacheKey] = cacheSpec.data
-            globalDict.release()
+            cacheStore = core_utils.get_cache_store()
+            views = cacheStore.build_views(main_key, cacheSpec.data)
+            cacheStore.set_entry(cacheKey, cacheSpec.data, cacheSpec.lastUpdate, views)
             tmpLog.debug('refreshed')
             return True
         except Exception:
@@ -3031,51 +3599,77 @@ class DBProxy(object):
             # return
             return False
 
-    # get a cached info
-    def get_cache(self, main_key, sub_key=None):
+    # get a cached info. Data is kept in the process for ttl sec, and then reloaded only if lastUpdate
+    # was changed in the database
+    def get_cache(self, main_key, sub_key=None, ttl=None):
         useDB = False
         try:
             # get logger
             tmpLog = core_utils.make_logger(_logger, 'mainKey={0} subKey={1}'.format(main_key, sub_key),
                                             method_name='get_cache')
             tmpLog.debug('start')
-            # get from global dict
+            if ttl is None:
+                ttl = getattr(getattr(harvester_config, 'cacher', None), 'localCacheTTL', 60)
             cacheKey = 'cache|{0}|{1}'.format(main_key, sub_key)
-            globalDict = core_utils.get_global_dict()
-            # lock dict
-            globalDict.acquire()
-            # found
-            if cacheKey in globalDict:
-                # release dict
-                globalDict.release()
-                # make spec
-                cacheSpec = CacheSpec()
-                cacheSpec.data = globalDict[cacheKey]
+            cacheStore = core_utils.get_cache_store()
+            # found in the process
+            entry = cacheStore.get_fresh_entry(cacheKey, ttl)
+            if entry is None:
+                # load in one thread while other threads wait for it
+                with cacheStore.get_key_lock(cacheKey):
+                    entry = cacheStore.get_fresh_entry(cacheKey, ttl)
+                    if entry is None:
+                        useDB = True
+                        varMap = dict()
+                        varMap[":mainKey"] = main_key
+                        sqlC = "WHERE mainKey=:mainKey "
+                        if sub_key is not None:
+                            sqlC += "AND subKey=:subKey "
+                            varMap[":subKey"] = sub_key
+                        # check if updated
+                        entry = cacheStore.get_entry(cacheKey)
+                        if entry is not None:
+                            cacheStore.count('probes')
+                            sqlU = "SELECT lastUpdate FROM {0} ".format(cacheTableName)
+                            sqlU += sqlC
+                            self.execute(sqlU, varMap)
+                            resU = self.cur.fetchone()
+                            if resU is not None and resU[0] == entry['lastUpdate']:
+                                cacheStore.count('revalidations')
+                                cacheStore.touch_entry(cacheKey)
+                            else:
+                                entry = None
+                        if entry is None:
+                            # read from database
+                            sql = "SELECT {0} FROM {1} ".format(CacheSpec.column_names(), cacheTableName)
+                            sql += sqlC
+                            self.execute(sql, varMap)
+                            resJ = self.cur.fetchone()
+                        # commit
+                        self.commit()
+                        if entry is None:
+                            if resJ is None:
+                                return None
+                            # make spec
+                            cacheSpec = CacheSpec()
+                            cacheSpec.pack(resJ)
+                            if cacheStore.get_entry(cacheKey) is None:
+                                cacheStore.count('misses')
+                            else:
+                                cacheStore.count('refreshes')
+                            views = cacheStore.build_views(main_key, cacheSpec.data)
+                            cacheStore.set_entry(cacheKey, cacheSpec.data, cacheSpec.lastUpdate, views)
+                            tmpLog.debug('loaded')
+                            return cacheSpec
+                    else:
+                        # loaded by another thread
+                        cacheStore.count('hits')
             else:
-                # read from database
-                useDB = True
-                sql = "SELECT {0} FROM {1} ".format(CacheSpec.column_names(), cacheTableName)
-                sql += "WHERE mainKey=:mainKey "
-                varMap = dict()
-                varMap[":mainKey"] = main_key
-                if sub_key is not None:
-                    sql += "AND subKey=:subKey "
-                    varMap[":subKey"] = sub_key
-                self.execute(sql, varMap)
-                resJ = self.cur.fetchone()
-                # commit
-                self.commit()
-                if resJ is None:
-                    # release dict
-                    globalDict.release()
-                    return None
-                # make spec
-                cacheSpec = CacheSpec()
-                cacheSpec.pack(resJ)
-                # put into global dict
-                globalDict[cacheKey] = cacheSpec.data
-                # release dict
-                globalDict.release()
+                cacheStore.count('hits')
+            # make spec
+            cacheSpec = CacheSpec()
+            cacheSpec.data = entry['data']
+            cacheSpec.lastUpdate = entry['lastUpdate']
             tmpLog.debug('done')
             # return
             return cacheSpec
@@ -3088,6 +3682,23 @@ class DBProxy(object):
             # return
             return None
 
+    # get statistics of cached info in the process
+    def get_cache_stats(self, reset=False):
+        return core_utils.get_cache_store().get_stats(reset)
+
+    # get pre-parsed views of a cached info, which are made once per refresh by the function registered
+    # to the cache store for the main key. Views are shared between threads and must not be modified
+    def get_cache_views(self, main_key, sub_key=None, ttl=None):
+        cacheSpec = self.get_cache(main_key, sub_key, ttl)
+        if cacheSpec is None:
+            return None
+        cacheKey = 'cache|{0}|{1}'.format(main_key, sub_key)
+        try:
+            return core_utils.get_cache_store().get_views(cacheKey, main_key)
+        except Exception:
+            core_utils.dump_error_message(_logger)
+            return None
+
     # store commands
     def store_commands(self, command_specs):
         # get logger
@@ -4071,6 +4682,46 @@ class DBProxy(object):
             # return
             return {}
 
+    # get file status for a list of LFNs
+    def get_file_status_bulk(self, lfns, file_type, endpoint, job_status):
+        try:
+            # get logger
+            tmpLog = core_utils.make_logger(_logger, 'nLFNs={0} endpoint={1}'.format(len(lfns), endpoint),
+                                            method_name='get_file_status_bulk')
+            tmpLog.debug('start')
+            # sql to get files
+            sqlF = "SELECT f.lfn, f.status, COUNT(*) cnt FROM {0} f, {1} j ".format(fileTableName, jobTableName)
+            sqlF += "WHERE j.PandaID=f.PandaID AND j.status=:jobStatus "
+            sqlF += "AND f.lfn IN ({0}) AND f.fileType=:type "
+            if endpoint is not None:
+                sqlF += "AND f.endpoint=:endpoint "
+            sqlF += "GROUP BY f.lfn, f.status "
+            # get files
+            retMap = dict()
+            for lfn in lfns:
+                retMap[lfn] = dict()
+            for lfnChunk in core_utils.create_shards(list(retMap), maxInListSize):
+                inExpr, varMap = make_in_list_expression(lfnChunk, 'lfn')
+                varMap[':type'] = file_type
+                varMap[':jobStatus'] = job_status
+                if endpoint is not None:
+                    varMap[':endpoint'] = endpoint
+                self.execute(sqlF.format(inExpr), varMap)
+                for lfn, status, cnt in self.cur.fetchall():
+                    retMap[lfn][status] = cnt
+            # commit
+            self.commit()
+            tmpLog.debug('got {0} LFNs in {1} queries'.format(len(retMap),
+                                                             (len(retMap) + maxInListSize - 1) // maxInListSize))
+            return retMap
+        except Exception:
+            # roll back
+            self.rollback()
+            # dump error
+            core_utils.dump_error_message(_logger)
+            # return
+            return {}
+
     # change file status
     def change_file_status(self, panda_id, data, locked_by):
         try:
@@ -4413,38 +5064,13 @@ class DBProxy(object):
             self.execute(sqlNR, varMap)
             resNR = self.cur.fetchall()
             # dynamic nQueueLimitWorker
-            retMap = dict()
             nRunning = 0
             nRT = 1
             for cnt, in resNR:
                 nRunning = cnt
             for cnt, in resNT:
                 nRT = max(nRT, cnt)
-            for maxWorkers, nQueueLimitWorker_orig, nQueueLimitWorkerRatio, \
-                nQueueLimitWorkerMax, nQueueLimitWorkerMin_orig in resQ:
-                if nQueueLimitWorkerRatio is not None and nQueueLimitWorkerRatio > 0:
-                    nQueueLimitWorkerByRatio = int(nRunning * nQueueLimitWorkerRatio / 100)
-                    nQueueLimitWorkerMin = 1
-                    if nQueueLimitWorkerMin_orig is not None:
-                        nQueueLimitWorkerMin = nQueueLimitWorkerMin_orig
-                    nQueueLimitWorkerMinAllRTs = nQueueLimitWorkerMin * nRT
-                    nQueueLimitWorker = max(nQueueLimitWorkerByRatio, nQueueLimitWorkerMinAllRTs)
-                    nQueueLimitWorkerPerRT = max(nQueueLimitWorkerByRatio, nQueueLimitWorkerMin)
-                    if nQueueLimitWorkerMax is not None:
-                        nQueueLimitWorker = min(nQueueLimitWorker, nQueueLimitWorkerMax)
-                        nQueueLimitWorkerPerRT = min(nQueueLimitWorkerPerRT, nQueueLimitWorkerMax)
-                elif nQueueLimitWorker_orig is not None:
-                    nQueueLimitWorker = nQueueLimitWorker_orig
-                    nQueueLimitWorkerPerRT = nQueueLimitWorker
-                else:
-                    nQueueLimitWorker = maxWorkers
-                    nQueueLimitWorkerPerRT = nQueueLimitWorker
-                nQueueLimitWorker = min(nQueueLimitWorker, maxWorkers)
-                retMap.update({
-                    'maxWorkers': maxWorkers,
-                    'nQueueLimitWorker': nQueueLimitWorker,
-                    'nQueueLimitWorkerPerRT': nQueueLimitWorkerPerRT,
-                })
+            retMap = self.calc_worker_limits(resQ, nRunning, nRT)
             # commit
             self.commit()
             tmpLog.debug('got {0}'.format(str(retMap)))
@@ -4457,6 +5083,90 @@ class DBProxy(object):
             # return
             return {}
 
+    # get worker limits of all queues in one go
+    def get_worker_limits_bulk(self):
+        try:
+            # get logger
+            tmpLog = core_utils.make_logger(_logger, method_name='get_worker_limits_bulk')
+            tmpLog.debug('start')
+            # sql to get
+            sqlQ = "SELECT siteName,maxWorkers,nQueueLimitWorker,nQueueLimitWorkerRatio,"
+            sqlQ += "nQueueLimitWorkerMax,nQueueLimitWorkerMin FROM {0} ".format(pandaQueueTableName)
+            sqlQ += "WHERE resourceType='ANY'"
+            # sql to count resource types
+            sqlNT = "SELECT siteName,COUNT(*) cnt FROM {0} ".format(pandaQueueTableName)
+            sqlNT += "WHERE resourceType!='ANY' GROUP BY siteName"
+            # sql to count running workers
+            sqlNR = "SELECT computingSite,COUNT(*) cnt FROM {0} ".format(workTableName)
+            sqlNR += "WHERE status IN (:status1) GROUP BY computingSite"
+            # get
+            self.execute(sqlQ)
+            resQ = self.cur.fetchall()
+            # count resource types
+            self.execute(sqlNT)
+            resNT = self.cur.fetchall()
+            # count running workers
+            varMap = dict()
+            varMap[':status1'] = 'running'
+            self.execute(sqlNR, varMap)
+            resNR = self.cur.fetchall()
+            nRunningMap = dict()
+            for siteName, cnt in resNR:
+                nRunningMap[siteName] = cnt
+            nRTMap = dict()
+            for siteName, cnt in resNT:
+                nRTMap[siteName] = cnt
+            resQMap = dict()
+            for tmpRes in resQ:
+                resQMap.setdefault(tmpRes[0], [])
+                resQMap[tmpRes[0]].append(tuple(tmpRes[1:]))
+            # dynamic nQueueLimitWorker
+            retMap = dict()
+            for siteName, tmpResQ in iteritems(resQMap):
+                retMap[siteName] = self.calc_worker_limits(tmpResQ, nRunningMap.get(siteName, 0),
+                                                           max(nRTMap.get(siteName, 1), 1))
+            # commit
+            self.commit()
+            tmpLog.debug('got limits for {0} sites'.format(len(retMap)))
+            return retMap
+        except Exception:
+            # roll back
+            self.rollback()
+            # dump error
+            core_utils.dump_error_message(_logger)
+            # return
+            return None
+
+    # calculate worker limits with queue attributes, the number of running workers and resource types
+    def calc_worker_limits(self, res_q, n_running, n_rt):
+        retMap = dict()
+        for maxWorkers, nQueueLimitWorker_orig, nQueueLimitWorkerRatio, \
+            nQueueLimitWorkerMax, nQueueLimitWorkerMin_orig in res_q:
+            if nQueueLimitWorkerRatio is not None and nQueueLimitWorkerRatio > 0:
+                nQueueLimitWorkerByRatio = int(n_running * nQueueLimitWorkerRatio / 100)
+                nQueueLimitWorkerMin = 1
+                if nQueueLimitWorkerMin_orig is not None:
+                    nQueueLimitWorkerMin = nQueueLimitWorkerMin_orig
+                nQueueLimitWorkerMinAllRTs = nQueueLimitWorkerMin * n_rt
+                nQueueLimitWorker = max(nQueueLimitWorkerByRatio, nQueueLimitWorkerMinAllRTs)
+                nQueueLimitWorkerPerRT = max(nQueueLimitWorkerByRatio, nQueueLimitWorkerMin)
+                if nQueueLimitWorkerMax is not None:
+                    nQueueLimitWorker = min(nQueueLimitWorker, nQueueLimitWorkerMax)
+                    nQueueLimitWorkerPerRT = min(nQueueLimitWorkerPerRT, nQueueLimitWorkerMax)
+            elif nQueueLimitWorker_orig is not None:
+                nQueueLimitWorker = nQueueLimitWorker_orig
+                nQueueLimitWorkerPerRT = nQueueLimitWorker
+            else:
+                nQueueLimitWorker = maxWorkers
+                nQueueLimitWorkerPerRT = nQueueLimitWorker
+            nQueueLimitWorker = min(nQueueLimitWorker, maxWorkers)
+            retMap.update({
+                'maxWorkers': maxWorkers,
+                'nQueueLimitWorker': nQueueLimitWorker,
+                'nQueueLimitWorkerPerRT': nQueueLimitWorkerPerRT,
+            })
+        return retMap
+
     # get worker CE stats
     def get_worker_ce_stats(self, site_name):
         try:
@@ -1,4 +1,5 @@
 import os
+import time
 import queue
 import threading
 from pandaharvester.harvesterconfig import harvester_config
@@ -8,6 +9,68 @@ from . import core_utils
 # logger
 _logger = core_utils.setup_logger('db_proxy_pool')
 
+# read-only methods which are routed to the read pool if available
+readOnlyMethods = set(['get_cache',
+                       'get_cache_views',
+                       'get_worker_stats',
+                       'get_worker_stats_bulk',
+                       'get_worker_limits',
+                       'get_worker_limits_bulk',
+                       'get_num_missed_workers',
+                       ])
+
+
+# pool of connections with statistics of wait time to get a connection and hold time to use it
+class ConnectionPool(object):
+    # constructor
+    def __init__(self, name, n_connections, thr_name, read_only=False, query_only=False):
+        self.name = name
+        self.queue = queue.Queue(n_connections)
+        for i in range(n_connections):
+            con = DBProxy(thr_name='{0}-{1}{2}'.format(thr_name, name[0], i), read_only=read_only,
+                          query_only=query_only)
+            self.queue.put(con)
+        self.statsLock = threading.Lock()
+        self.reset_stats()
+
+    # get connection
+    def get(self):
+        return self.queue.get()
+
+    # release connection
+    def put(self, con):
+        self.queue.put(con)
+
+    # number of available connections
+    def qsize(self):
+        return self.queue.qsize()
+
+    # reset statistics
+    def reset_stats(self):
+        with self.statsLock:
+            self.stats = {'nCalls': 0, 'waitTime': 0., 'maxWaitTime': 0., 'holdTime': 0., 'maxHoldTime': 0.}
+
+    # record wait and hold time
+    def record(self, wait_time, hold_time):
+        with self.statsLock:
+            self.stats['nCalls'] += 1
+            self.stats['waitTime'] += wait_time
+            self.stats['maxWaitTime'] = max(self.stats['maxWaitTime'], wait_time)
+            self.stats['holdTime'] += hold_time
+            self.stats['maxHoldTime'] = max(self.stats['maxHoldTime'], hold_time)
+
+    # get statistics
+    def get_stats(self, reset=False):
+        with self.statsLock:
+            stats = dict(self.stats)
+        nCalls = max(stats['nCalls'], 1)
+        stats['avgWaitTime'] = stats['waitTime'] / nCalls
+        stats['avgHoldTime'] = stats['holdTime'] / nCalls
+        stats['qsize'] = self.qsize()
+        if reset:
+            self.reset_stats()
+        return stats
+
 
 # method wrapper
 class DBProxyMethod(object):
@@ -20,10 +83,13 @@ class DBProxyMethod(object):
     def __call__(self, *args, **kwargs):
         tmpLog = core_utils.make_logger(_logger, 'method={0}'.format(self.methodName), method_name='call')
         sw = core_utils.get_stopwatch()
+        timeStart = time.time()
         try:
             # get connection
             con = self.pool.get()
-            tmpLog.debug('got lock. qsize={0} {1}'.format(self.pool.qsize(), sw.get_elapsed_time()))
+            timeGot = time.time()
+            tmpLog.debug('got lock. pool={0} qsize={1} {2}'.format(self.pool.name, self.pool.qsize(),
+                                                                    sw.get_elapsed_time()))
             sw.reset()
             # get function
             func = getattr(con, self.methodName)
@@ -32,6 +98,7 @@ class DBProxyMethod(object):
         finally:
             tmpLog.debug('release lock' + sw.get_elapsed_time())
             self.pool.put(con)
+            self.pool.record(timeGot - timeStart, time.time() - timeGot)
 
 
 # connection class
@@ -47,17 +114,27 @@ class DBProxyPool(object):
     def initialize(self, read_only=False):
         # install members
         object.__setattr__(self, 'pool', None)
-        # connection pool
-        self.pool = queue.Queue(harvester_config.db.nConnections)
+        object.__setattr__(self, 'readPool', None)
         currentThr = threading.current_thread()
         if currentThr is None:
             thrID = None
         else:
             thrID = currentThr.ident
         thrName = '{0}-{1}'.format(os.getpid(), thrID)
-        for i in range(harvester_config.db.nConnections):
-            con = DBProxy(thr_name='{0}-{1}'.format(thrName, i), read_only=read_only)
-            self.pool.put(con)
+        # connection pool
+        self.pool = ConnectionPool('write', harvester_config.db.nConnections, thrName, read_only=read_only)
+        # pool of query-only connections for read-only methods not to wait for write transactions
+        nReadConnections = getattr(harvester_config.db, 'nReadConnections', 0)
+        if nReadConnections > 0 and not read_only:
+            self.readPool = ConnectionPool('read', nReadConnections, thrName, query_only=True)
+
+    # get statistics of wait and hold time per pool
+    def get_pool_stats(self, reset=False):
+        retMap = dict()
+        for pool in [self.pool, self.readPool]:
+            if pool is not None:
+                retMap[pool.name] = pool.get_stats(reset)
+        return retMap
 
     # override __new__ to have a singleton
     def __new__(cls, *args, **kwargs):
@@ -79,6 +156,9 @@ class DBProxyPool(object):
         except Exception:
             pass
         # method object
-        tmpO = DBProxyMethod(name, self.pool)
+        if name in readOnlyMethods and self.readPool is not None:
+            tmpO = DBProxyMethod(name, self.readPool)
+        else:
+            tmpO = DBProxyMethod(name, self.pool)
         object.__setattr__(self, name, tmpO)
         return tmpO
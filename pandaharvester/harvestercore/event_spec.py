@@ -20,6 +20,10 @@ class EventSpec(SpecBase):
                            'fileID:integer'
                            )
 
+    # composite indexes
+    indexes = ('PandaID,subStatus',
+               )
+
     # constructor
     def __init__(self):
         SpecBase.__init__(self)
@@ -3,10 +3,12 @@ import time
 import datetime
 import collections
 import socket
+import threading
 from calendar import timegm
 from future.utils import iteritems
 
 import json
+import zlib
 try:
     import cPickle as pickle
 except ImportError:
@@ -22,6 +24,7 @@ from pandaharvester.harvestercore import core_utils
 from pandaharvester.harvestercore.plugin_factory import PluginFactory
 from pandaharvester.harvestercore.db_proxy_pool import DBProxyPool as DBProxy
 from pandaharvester.harvestercore.db_interface import DBInterface
+from pandaharvester.harvestercore.work_spec import WorkSpec
 
 # attribute list
 _attribute_list = ['id', 'item', 'score']
@@ -32,6 +35,125 @@ FifoObject = collections.namedtuple('FifoObject', _attribute_list, verbose=False
 # logger
 _logger = core_utils.setup_logger('fifos')
 
+# conditions and counters of enqueue per fifo to wake up waiting threads in the process
+_fifo_condition_map = dict()
+_fifo_put_counter_map = collections.defaultdict(int)
+_fifo_condition_map_lock = threading.Lock()
+
+
+# get condition of fifo
+def _get_fifo_condition(fifo_name):
+    with _fifo_condition_map_lock:
+        if fifo_name not in _fifo_condition_map:
+            _fifo_condition_map[fifo_name] = threading.Condition()
+        return _fifo_condition_map[fifo_name]
+
+
+# encoder for datetime in compact codec
+class _CompactEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime.datetime):
+            return {'_dt': obj.strftime('%Y-%m-%d %H:%M:%S.%f')}
+        return json.JSONEncoder.default(self, obj)
+
+
+# decoder hook for datetime in compact codec
+def _compact_object_hook(dct):
+    if '_dt' in dct and len(dct) == 1:
+        return datetime.datetime.strptime(dct['_dt'], '%Y-%m-%d %H:%M:%S.%f')
+    return dct
+
+
+# codec for fifo objects with pickle
+class PickleFifoCodec(object):
+    # encode
+    def encode(self, item):
+        return pickle.dumps(item, -1)
+
+    # decode
+    def decode(self, item_serialized):
+        return pickle.loads(item_serialized)
+
+
+# compact codec for chunks of workers, i.e. (queueName, [[WorkSpec, ...], ...]).
+# WorkSpecs are stored as rows of DB columns with PandaIDs in compressed json, without
+# jobspec_list or other transient attributes. Other objects are pickled
+class CompactFifoCodec(PickleFifoCodec):
+    # header to distinguish from pickle
+    header = b'HFC1'
+    # non-column attributes to keep
+    extraAttrs = ('pandaid_list', 'pilot_closed', 'nextLookup')
+
+    # constructor
+    def __init__(self, compress_level=1):
+        self.compressLevel = compress_level
+        self.columns = [attr.split(':')[0] for attr in WorkSpec.attributesWithTypes]
+
+    # check if item is a chunk of workers
+    def _is_worker_chunk(self, item):
+        try:
+            queueName, workSpecsList = item
+            for workSpecs in workSpecsList:
+                for workSpec in workSpecs:
+                    if not isinstance(workSpec, WorkSpec):
+                        return False
+            return True
+        except Exception:
+            return False
+
+    # encode
+    def encode(self, item):
+        if not self._is_worker_chunk(item):
+            return PickleFifoCodec.encode(self, item)
+        queueName, workSpecsList = item
+        rowsList = []
+        for workSpecs in workSpecsList:
+            rows = []
+            for workSpec in workSpecs:
+                row = [getattr(workSpec, attr) for attr in self.columns]
+                pandaIDs = workSpec.pandaid_list
+                if pandaIDs is None and workSpec.get_jobspec_list() is not None:
+                    pandaIDs = [jobSpec.PandaID for jobSpec in workSpec.get_jobspec_list()]
+                row += [pandaIDs, workSpec.pilot_closed, workSpec.nextLookup]
+                rows.append(row)
+            rowsList.append(rows)
+        data = {'queue': queueName, 'columns': self.columns, 'rows': rowsList}
+        try:
+            data_serialized = json.dumps(data, cls=_CompactEncoder, separators=(',', ':')).encode('utf-8')
+        except Exception:
+            # non-json attributes
+            return PickleFifoCodec.encode(self, item)
+        return self.header + zlib.compress(data_serialized, self.compressLevel)
+
+    # decode
+    def decode(self, item_serialized):
+        if not item_serialized.startswith(self.header):
+            return PickleFifoCodec.decode(self, item_serialized)
+        data = json.loads(zlib.decompress(item_serialized[len(self.header):]).decode('utf-8'),
+                          object_hook=_compact_object_hook)
+        columns = data['columns']
+        workSpecsList = []
+        for rows in data['rows']:
+            workSpecs = []
+            for row in rows:
+                workSpec = WorkSpec()
+                for attr, val in zip(columns, row):
+                    if attr in workSpec.attributes:
+                        object.__setattr__(workSpec, attr, val)
+                for attr, val in zip(self.extraAttrs, row[len(columns):]):
+                    object.__setattr__(workSpec, attr, val)
+                workSpecs.append(workSpec)
+            workSpecsList.append(workSpecs)
+        return (data['queue'], workSpecsList)
+
+
+# map of fifo codecs
+_codec_map = {
+    'pickle': PickleFifoCodec,
+    'compact': CompactFifoCodec,
+    }
+
+
 # base class of fifo message queue
 class FIFOBase(object):
     # constructor
@@ -42,6 +164,9 @@ class FIFOBase(object):
         self.os_pid = os.getpid()
         self.dbProxy = DBProxy()
         self.dbInterface = DBInterface()
+        # objects are decoded in any format while encoded with the codec in config
+        self.encode_codec = PickleFifoCodec()
+        self.decode_codec = CompactFifoCodec()
 
     # get process identifier
     def get_pid(self):
@@ -81,15 +206,50 @@ class FIFOBase(object):
                                 'name': harvester_config.fifo.fifoClass,} )
         pluginFactory = PluginFactory()
         self.fifo = pluginFactory.get_plugin(pluginConf)
+        # codec to encode objects
+        self.encode_codec = _codec_map.get(getattr(self.config, 'fifoCodec', 'pickle'), PickleFifoCodec)()
+
+    # notify threads waiting for objects
+    def _notify_put(self):
+        condition = _get_fifo_condition(self.fifoName)
+        with condition:
+            _fifo_put_counter_map[self.fifoName] += 1
+            condition.notify_all()
+
+    # block until the first object is due, i.e. its score is not greater than the current time, or timeout.
+    # woken up when objects are enqueued in the same process, and re-peeks at least every max_poll_interval sec
+    # to catch objects enqueued by other processes. Return True if an object is due
+    def wait_for_due(self, timeout, max_poll_interval=10):
+        mainLog = self.make_logger(_logger, 'id={0}-{1}'.format(self.fifoName, self.get_pid()), method_name='wait_for_due')
+        condition = _get_fifo_condition(self.fifoName)
+        deadline = time.time() + timeout
+        while True:
+            with condition:
+                put_counter = _fifo_put_counter_map[self.fifoName]
+            peeked_tuple = self.fifo.peek(skip_item=True)
+            timeNow = time.time()
+            if peeked_tuple is not None and peeked_tuple[2] is not None and peeked_tuple[2] <= timeNow:
+                mainLog.debug('due')
+                return True
+            if timeNow >= deadline:
+                mainLog.debug('timeout')
+                return False
+            wait_time = min(deadline - timeNow, max_poll_interval)
+            if peeked_tuple is not None and peeked_tuple[2] is not None:
+                wait_time = min(wait_time, peeked_tuple[2] - timeNow)
+            with condition:
+                # skip waiting if objects were enqueued after peek
+                if put_counter == _fifo_put_counter_map[self.fifoName]:
+                    condition.wait(wait_time)
 
     # encode
     def encode(self, item):
-        item_serialized = pickle.dumps(item, -1)
+        item_serialized = self.encode_codec.encode(item)
         return item_serialized
 
     # decode
     def decode(self, item_serialized):
-        item = pickle.loads(item_serialized)
+        item = self.decode_codec.decode(item_serialized)
         return item
 
     # size of queue
@@ -109,6 +269,7 @@ class FIFOBase(object):
         if score is None:
             score = time.time()
         retVal = self.fifo.put(item_serialized, score)
+        self._notify_put()
         mainLog.debug('score={0}'.format(score))
         return retVal
 
@@ -122,9 +283,62 @@ class FIFOBase(object):
         if score is None:
             score = time.time()
         retVal = self.fifo.putbyid(id, item_serialized, score)
+        self._notify_put()
         mainLog.debug('id={0} score={1}'.format(id, score))
         return retVal
 
+    # enqueue list of items in bulk. score can be a list of scores for each item or a common score.
+    # backends put all items in one transaction, so none is put when an exception is raised
+    def putmany(self, item_list, score=None, encode_item=True):
+        mainLog = self.make_logger(_logger, 'id={0}-{1}'.format(self.fifoName, self.get_pid()), method_name='putmany')
+        if score is None:
+            score = time.time()
+        if isinstance(score, (list, tuple)):
+            score_list = score
+        else:
+            score_list = [score] * len(item_list)
+        item_score_list = []
+        for item, tmp_score in zip(item_list, score_list):
+            if encode_item:
+                item_serialized = self.encode(item)
+            else:
+                item_serialized = item
+            item_score_list.append((item_serialized, tmp_score))
+        if hasattr(self.fifo, 'putmany'):
+            retVal = self.fifo.putmany(item_score_list)
+        else:
+            retVal = 0
+            for item_serialized, tmp_score in item_score_list:
+                if self.fifo.put(item_serialized, tmp_score):
+                    retVal += 1
+        self._notify_put()
+        mainLog.debug('put {0}/{1} objects'.format(retVal, len(item_score_list)))
+        return retVal
+
+    # enqueue list of items by ids in bulk. id_item_score_list is a list of (id, item, score)
+    def putmanybyid(self, id_item_score_list, encode_item=True):
+        mainLog = self.make_logger(_logger, 'id={0}-{1}'.format(self.fifoName, self.get_pid()), method_name='putmanybyid')
+        timeNow = time.time()
+        id_item_serialized_score_list = []
+        for id, item, score in id_item_score_list:
+            if encode_item:
+                item_serialized = self.encode(item)
+            else:
+                item_serialized = item
+            if score is None:
+                score = timeNow
+            id_item_serialized_score_list.append((id, item_serialized, score))
+        if hasattr(self.fifo, 'putmanybyid'):
+            retVal = self.fifo.putmanybyid(id_item_serialized_score_list)
+        else:
+            retVal = 0
+            for id, item_serialized, score in id_item_serialized_score_list:
+                if self.fifo.putbyid(id, item_serialized, score):
+                    retVal += 1
+        self._notify_put()
+        mainLog.debug('put {0}/{1} objects'.format(retVal, len(id_item_serialized_score_list)))
+        return retVal
+
     # dequeue to get the first fifo object
     def get(self, timeout=None, protective=False, decode_item=True):
         mainLog = self.make_logger(_logger, 'id={0}-{1}'.format(self.fifoName, self.get_pid()), method_name='get')
@@ -262,6 +476,7 @@ class FIFOBase(object):
     def restore(self, ids=None):
         mainLog = self.make_logger(_logger, 'id={0}-{1}'.format(self.fifoName, self.get_pid()), method_name='restore')
         retVal = self.fifo.restore(ids)
+        self._notify_put()
         if ids is None:
             mainLog.debug('restored all objects')
         else:
@@ -272,6 +487,7 @@ class FIFOBase(object):
     def update(self, id, item=None, score=None, temporary=None, cond_score='gt'):
         mainLog = self.make_logger(_logger, 'id={0}-{1}'.format(self.fifoName, self.get_pid()), method_name='update')
         retVal = self.fifo.update(id, item, score, temporary, cond_score)
+        self._notify_put()
         update_report_list = []
         if item is not None:
             update_report_list.append('item={0}'.format(item))
@@ -328,6 +544,19 @@ class MonitorFIFO(FIFOBase):
             fifoMaxWorkersPerChunk = self.config.fifoMaxWorkersPerChunk
         except AttributeError:
             fifoMaxWorkersPerChunk = 500
+        fifoMaxChunksPerPut = getattr(self.config, 'fifoMaxChunksPerPut', 100)
+        # put chunks in bulk
+        obj_list = []
+        score_list = []
+
+        def _put_chunk(obj, tmp_score, flush=False):
+            if obj is not None:
+                obj_list.append(obj)
+                score_list.append(tmp_score)
+            if len(obj_list) > 0 and (flush or len(obj_list) >= fifoMaxChunksPerPut):
+                self.putmany(obj_list, score_list)
+                del obj_list[:]
+                del score_list[:]
         workspec_iterator = self.dbProxy.get_active_workers(fifoMaxWorkersToPopulate, seconds_ago)
         last_queueName = None
         workspec_chunk = []
@@ -346,7 +575,7 @@ class MonitorFIFO(FIFOBase):
                 and len(workspec_chunk) < fifoMaxWorkersPerChunk:
                 workspec_chunk.append([workspec])
             else:
-                self.put((last_queueName, workspec_chunk), score)
+                _put_chunk((last_queueName, workspec_chunk), score)
                 try:
                     score = timegm(workspec.modificationTime.utctimetuple())
                 except Exception:
@@ -354,7 +583,8 @@ class MonitorFIFO(FIFOBase):
                 workspec_chunk = [[workspec]]
                 last_queueName = workspec.computingSite
         if len(workspec_chunk) > 0:
-            self.put((last_queueName, workspec_chunk), score)
+            _put_chunk((last_queueName, workspec_chunk), score)
+        _put_chunk(None, None, flush=True)
 
     def to_check_workers(self, check_interval=harvester_config.monitor.checkInterval):
         """
@@ -45,6 +45,11 @@ class FileSpec(SpecBase):
                  'todelete'
                  )
 
+    # composite indexes
+    indexes = ('PandaID,fileType',
+               'lfn,fileType,endpoint'
+               )
+
     # constructor
     def __init__(self):
         SpecBase.__init__(self)
@@ -74,6 +74,11 @@ class JobSpec(SpecBase):
                  'nWorkersInTotal'
                  )
 
+    # composite indexes
+    indexes = ('subStatus,preparatorTime',
+               'subStatus,stagerTime'
+               )
+
     # attributes to skip when slim reading
     skipAttrsToSlim = ('jobParams')
 
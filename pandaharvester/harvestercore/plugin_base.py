@@ -3,6 +3,11 @@ from pandaharvester.harvestercore import core_utils
 
 
 class PluginBase(object):
+    # set True if an instance can be reused by PluginFactory for the same config
+    isReusable = False
+    # set True if a reusable instance can be shared by threads. Otherwise instances are reused per thread
+    isThreadSafe = False
+
     def __init__(self, **kwarg):
         for tmpKey, tmpVal in iteritems(kwarg):
             setattr(self, tmpKey, tmpVal)
@@ -1,3 +1,7 @@
+import json
+import hashlib
+import threading
+
 from future.utils import iteritems
 
 from . import core_utils
@@ -13,15 +17,56 @@ class PluginFactory(object):
     def __init__(self, no_db=False):
         self.classMap = {}
         self.noDB = no_db
+        # reusable instances shared by threads; (plugin key, queue name) -> (config hash, instance)
+        self.instanceMap = {}
+        # reusable instances per thread for plugins which are not thread-safe
+        self.threadLocal = threading.local()
+        self.lock = threading.Lock()
+
+    # get hash of plugin config, which is independent of order of keys
+    def get_config_hash(self, plugin_conf):
+        confStr = json.dumps(plugin_conf, sort_keys=True, default=str)
+        return hashlib.md5(confStr.encode('utf-8')).hexdigest()
 
-    # get plugin
+    # get plugin. The instance is cached and reused when the class has isReusable=True, shared by all threads
+    # if the class also has isThreadSafe=True or otherwise per thread. A new instance is made when the config
+    # is changed
     def get_plugin(self, plugin_conf):
         # use module + class as key
         moduleName = plugin_conf['module']
         className = plugin_conf['name']
-        pluginKey = '{0}.{1}'.format(moduleName, className)
         if moduleName is None or className is None:
             return None
+        cls = self.get_plugin_class(plugin_conf)
+        if not getattr(cls, 'isReusable', False):
+            return self.make_plugin(plugin_conf)
+        # look for cached instance
+        slotKey = ('{0}.{1}'.format(moduleName, className), plugin_conf.get('queueName'))
+        configHash = self.get_config_hash(plugin_conf)
+        if getattr(cls, 'isThreadSafe', False):
+            instanceMap = self.instanceMap
+        else:
+            if not hasattr(self.threadLocal, 'instanceMap'):
+                self.threadLocal.instanceMap = {}
+            instanceMap = self.threadLocal.instanceMap
+        with self.lock:
+            if slotKey in instanceMap and instanceMap[slotKey][0] == configHash:
+                return instanceMap[slotKey][1]
+        impl = self.make_plugin(plugin_conf)
+        with self.lock:
+            # use the instance made by another thread in the meantime
+            if slotKey in instanceMap and instanceMap[slotKey][0] == configHash:
+                return instanceMap[slotKey][1]
+            # replace the instance with old config
+            instanceMap[slotKey] = (configHash, impl)
+        return impl
+
+    # get plugin class
+    def get_plugin_class(self, plugin_conf):
+        # use module + class as key
+        moduleName = plugin_conf['module']
+        className = plugin_conf['name']
+        pluginKey = '{0}.{1}'.format(moduleName, className)
         # get class
         if pluginKey not in self.classMap:
             tmpLog = core_utils.make_logger(_logger, method_name='get_plugin')
@@ -35,6 +80,10 @@ class PluginFactory(object):
             cls = getattr(mod, className)
             # add
             self.classMap[pluginKey] = cls
+        return self.classMap[pluginKey]
+
+    # make a new plugin instance
+    def make_plugin(self, plugin_conf):
         # make args
         args = {}
         for tmpKey, tmpVal in iteritems(plugin_conf):
@@ -45,7 +94,7 @@ class PluginFactory(object):
         if not self.noDB:
             args['dbInterface'] = DBInterface()
         # instantiate
-        cls = self.classMap[pluginKey]
+        cls = self.get_plugin_class(plugin_conf)
         impl = cls(**args)
         # bare instance when middleware is used
         if 'original_config' in plugin_conf and 'bareFunctions' in plugin_conf:
@@ -546,7 +546,7 @@ class QueueConfigMapper(six.with_metaclass(SingletonWithID, object)):
                     continue
                 # filter for pilot version
                 if hasattr(harvester_config.qconf, 'pilotVersion') and \
-                    pandaQueueDict[queueConfig.siteName].get('pilot_version') != str(harvester_config.qconf.pilotVersion):
+                    pandaQueueDict.get_pilot_version(queueConfig.siteName) != str(harvester_config.qconf.pilotVersion):
                     continue
                 if 'ALL' not in harvester_config.qconf.queueList and \
                         'DYNAMIC' not in harvester_config.qconf.queueList and \
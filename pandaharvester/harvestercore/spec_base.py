@@ -38,6 +38,8 @@ class SpecBase(object):
     attributesWithTypes = ()
     zeroAttrs = ()
     skipAttrsToSlim = ()
+    # composite indexes. comma-separated column names with an optional / unique decorator
+    indexes = ()
 
     # constructor
     def __init__(self):
@@ -96,6 +96,11 @@ class WorkSpec(SpecBase):
                            'errorDiag:text'
                            )
 
+    # composite indexes
+    indexes = ('status,modificationTime',
+               'computingSite,status'
+               )
+
     # attributes to skip when slim reading
     skipAttrsToSlim = ('workParams', 'workAttributes')
 
@@ -174,6 +174,24 @@ class MysqlFifo(PluginBase):
         else:
             return False
 
+    def _push_many(self, item_score_list):
+        sql_push = (
+                'INSERT INTO {table_name} '
+                '(item, score) '
+                'VALUES (%s, %s) '
+            ).format(table_name=self.tableName)
+        self.executemany(sql_push, item_score_list)
+        return self.cur.rowcount
+
+    def _push_many_by_id(self, id_item_score_list):
+        sql_push = (
+                'INSERT IGNORE INTO {table_name} '
+                '(id, item, score) '
+                'VALUES (%s, %s, %s) '
+            ).format(table_name=self.tableName)
+        self.executemany(sql_push, id_item_score_list)
+        return self.cur.rowcount
+
     def _pop(self, timeout=None, protective=False, mode='first'):
         sql_pop_get_first = (
                 'SELECT id, item, score FROM {table_name} '
@@ -354,6 +372,32 @@ class MysqlFifo(PluginBase):
         else:
             return retVal
 
+    # enqueue list of (item, score) in one transaction
+    def putmany(self, item_score_list):
+        if not item_score_list:
+            return 0
+        try:
+            n_row = self._push_many(list(item_score_list))
+            self.commit()
+        except Exception as _e:
+            self.rollback()
+            raise _e
+        else:
+            return n_row
+
+    # enqueue list of (id, item, score) in one transaction
+    def putmanybyid(self, id_item_score_list):
+        if not id_item_score_list:
+            return 0
+        try:
+            n_row = self._push_many_by_id(list(id_item_score_list))
+            self.commit()
+        except Exception as _e:
+            self.rollback()
+            raise _e
+        else:
+            return n_row
+
     # dequeue the first object
     def get(self, timeout=None, protective=False):
         return self._pop(timeout=timeout, protective=protective)
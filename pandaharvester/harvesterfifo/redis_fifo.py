@@ -158,6 +158,69 @@ class RedisFifo(PluginBase):
                 return True
         return False
 
+    # enqueue list of (id, item, score) in one transaction, and return list of ids successfully put
+    def _push_many_by_id(self, id_item_score_list):
+        with self.qconn.pipeline() as pipeline:
+            while True:
+                try:
+                    pipeline.watch(self.id_score, self.id_item)
+                    pipeline.multi()
+                    for id, item, score in id_item_score_list:
+                        pipeline.execute_command('ZADD', self.id_score, 'NX', score, id)
+                        pipeline.hsetnx(self.id_item, id, item)
+                    resVal = pipeline.execute()
+                except redis.WatchError:
+                    continue
+                else:
+                    break
+        ret_list = []
+        for i_obj, (id, item, score) in enumerate(id_item_score_list):
+            if resVal[2*i_obj] == 1 and resVal[2*i_obj+1] == 1:
+                ret_list.append(id)
+        return ret_list
+
+    # enqueue list of (item, score) in one transaction. either all or none of objects are put
+    def putmany(self, item_score_list):
+        item_score_list = list(item_score_list)
+        if not item_score_list:
+            return 0
+        generate_id_attempt_timestamp = time.time()
+        with self.qconn.pipeline() as pipeline:
+            while True:
+                try:
+                    pipeline.watch(self.id_score, self.id_item)
+                    # pick ids not in use while keys are watched, so that no id collides in the transaction
+                    id_list = []
+                    id_set = set()
+                    while len(id_list) < len(item_score_list):
+                        candidate_list = [random_id() for i in range(len(item_score_list) - len(id_list))]
+                        for id, item_in_use in zip(candidate_list, pipeline.hmget(self.id_item, candidate_list)):
+                            if item_in_use is None and id not in id_set:
+                                id_set.add(id)
+                                id_list.append(id)
+                        if len(id_list) < len(item_score_list) and time.time() > generate_id_attempt_timestamp + 60:
+                            raise Exception('Cannot generate unique id')
+                    pipeline.multi()
+                    for id, (item, score) in zip(id_list, item_score_list):
+                        pipeline.execute_command('ZADD', self.id_score, 'NX', score, id)
+                        pipeline.hsetnx(self.id_item, id, item)
+                    resVal = pipeline.execute()
+                except redis.WatchError:
+                    continue
+                else:
+                    break
+        n_put = 0
+        for i_obj in range(len(id_list)):
+            if resVal[2*i_obj] == 1 and resVal[2*i_obj+1] == 1:
+                n_put += 1
+        return n_put
+
+    # enqueue list of (id, item, score) in one transaction
+    def putmanybyid(self, id_item_score_list):
+        if not id_item_score_list:
+            return 0
+        return len(self._push_many_by_id(id_item_score_list))
+
     # dequeue the first object
     def get(self, timeout=None, protective=False):
         return self._pop(timeout=timeout, protective=protective, mode='first')
@@ -198,6 +198,28 @@ class SqliteFifo(PluginBase):
                 retVal = True
         return retVal
 
+    # enqueue list of (item, score) in one transaction
+    def putmany(self, item_score_list):
+        params_list = [(memoryviewOrBuffer(item), score) for item, score in item_score_list]
+        if not params_list:
+            return 0
+        with self._get_conn() as conn:
+            conn.execute(self._write_lock_sql)
+            cursor = conn.executemany(self._push_sql, params_list)
+            n_row = cursor.rowcount
+        return n_row
+
+    # enqueue list of (id, item, score) in one transaction
+    def putmanybyid(self, id_item_score_list):
+        params_list = [(id, memoryviewOrBuffer(item), score) for id, item, score in id_item_score_list]
+        if not params_list:
+            return 0
+        with self._get_conn() as conn:
+            conn.execute(self._write_lock_sql)
+            cursor = conn.executemany(self._push_by_id_sql, params_list)
+            n_row = cursor.rowcount
+        return n_row
+
     # dequeue the first object
     def get(self, timeout=None, protective=False):
         sql_str = self._lpop_get_sql_template.format(columns='id, item, score')
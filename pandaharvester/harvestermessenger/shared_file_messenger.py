@@ -2,6 +2,7 @@ import json
 import os
 import shutil
 import datetime
+import time
 
 try:
     from urllib.parse import urlencode
@@ -22,12 +23,18 @@ import re
 import uuid
 import os.path
 import fnmatch
+import threading
 import distutils.spawn
 import multiprocessing
 from future.utils import iteritems
 from past.builtins import long
 from concurrent.futures import ThreadPoolExecutor as Pool
 
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
 from pandaharvester.harvestercore import core_utils
 from pandaharvester.harvestercore.work_spec import WorkSpec
 from .base_messenger import BaseMessenger
@@ -144,16 +151,181 @@ def scan_files_in_dir(dir_name, patterns=None):
             pfn = os.path.join(root, filename)
             lfn = os.path.basename(pfn)
             tmpFileDict['path'] = pfn
-            tmpFileDict['fsize'] = os.stat(pfn).st_size
             tmpFileDict['type'] = 'es_output'
             tmpFileDict['guid'] = str(uuid.uuid4())
-            tmpFileDict['chksum'] = core_utils.calc_adler32(pfn)
             tmpFileDict['eventRangeID'] = lfn.split('.')[-1]
             tmpFileDict['eventStatus'] = "finished"
             fileList.append(tmpFileDict)
+    # get sizes and checksums in parallel with the shared thread pool
+    checksumEngine = core_utils.get_checksum_engine()
+    fileInfoMap = checksumEngine.get_size_and_checksum_bulk([tmpFileDict['path'] for tmpFileDict in fileList])
+    for tmpFileDict in fileList:
+        pfn = tmpFileDict['path']
+        if pfn in fileInfoMap:
+            tmpFileDict['fsize'], tmpFileDict['chksum'] = fileInfoMap[pfn]
+        else:
+            tmpFileDict['fsize'], tmpFileDict['chksum'] = checksumEngine.get_size_and_checksum(pfn)
     return fileList
 
 
+# index of file names in access points to skip metadata operations on directories which have not changed.
+# Directories are checked at most once per ttl sec, which should be longer than the span of a check cycle so that
+# all existence checks of a worker in the cycle share one check. Changes are detected by directory mtime, or by
+# inotify which is valid only for local file systems since writes from other nodes on shared file systems don't
+# generate events. Directories which cannot be watched, e.g. due to the limit of watches, fall back to mtime
+class DirectoryIndex(object):
+    # constructor
+    def __init__(self, use_inotify=False, mtime_margin=2, ttl=60):
+        self.lock = threading.Lock()
+        # directory path -> {'mtime', 'scanTime', 'checkTime', 'names', 'dirty', 'watched'}
+        self.dirMap = dict()
+        # margin in sec to distrust directory mtime since its granularity can be coarse
+        self.mtimeMargin = mtime_margin
+        # interval in sec to check directories without watch
+        self.ttl = ttl
+        self.inotify = None
+        self.watchMap = dict()
+        if use_inotify and inotify_simple is not None:
+            try:
+                self.inotify = inotify_simple.INotify()
+                flags = inotify_simple.flags
+                self.watchFlags = flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO | \
+                    flags.DELETE_SELF | flags.MOVE_SELF
+            except Exception:
+                self.inotify = None
+        # statistics
+        self.nHits = 0
+        self.nStats = 0
+        self.nScans = 0
+
+    # consume inotify events to invalidate directories
+    def _read_events(self):
+        for event in self.inotify.read(timeout=0):
+            if event.wd < 0:
+                # queue overflow
+                for dirInfo in self.dirMap.values():
+                    dirInfo['dirty'] = True
+                continue
+            dirPath = self.watchMap.get(event.wd)
+            if dirPath is None:
+                continue
+            if event.mask & inotify_simple.flags.IGNORED:
+                # watch was removed with the directory
+                del self.watchMap[event.wd]
+                self.dirMap.pop(dirPath, None)
+            elif dirPath in self.dirMap:
+                self.dirMap[dirPath]['dirty'] = True
+
+    # scan a directory
+    def _scan(self, dir_path):
+        names = set()
+        for entry in scandir(dir_path):
+            names.add(entry.name)
+        return names
+
+    # get mtime of a directory. None if the directory doesn't exist
+    def _get_mtime(self, dir_path):
+        with self.lock:
+            self.nStats += 1
+        try:
+            return os.stat(dir_path).st_mtime
+        except OSError:
+            with self.lock:
+                self.dirMap.pop(dir_path, None)
+            return None
+
+    # get file names in a directory. None if the directory doesn't exist
+    def get_names(self, dir_path):
+        timeNow = time.time()
+        with self.lock:
+            if self.inotify is not None:
+                self._read_events()
+            dirInfo = self.dirMap.get(dir_path)
+            if dirInfo is not None and not dirInfo['dirty']:
+                if dirInfo['watched'] or timeNow - dirInfo['checkTime'] < self.ttl:
+                    self.nHits += 1
+                    return dirInfo['names']
+        useWatch = self.inotify is not None and (dirInfo is None or dirInfo['watched'])
+        mtime = None
+        if not useWatch:
+            mtime = self._get_mtime(dir_path)
+            if mtime is None:
+                return None
+            with self.lock:
+                dirInfo = self.dirMap.get(dir_path)
+                if dirInfo is not None and not dirInfo['dirty'] and dirInfo['mtime'] == mtime \
+                        and dirInfo['scanTime'] - mtime > self.mtimeMargin:
+                    dirInfo['checkTime'] = timeNow
+                    self.nHits += 1
+                    return dirInfo['names']
+        # add watch before scanning not to miss changes during the scan
+        watchDescriptor = None
+        if useWatch:
+            try:
+                watchDescriptor = self.inotify.add_watch(dir_path, self.watchFlags)
+            except OSError:
+                # no directory or too many watches. use mtime for the directory
+                mtime = self._get_mtime(dir_path)
+                if mtime is None:
+                    return None
+        scanTime = time.time()
+        try:
+            names = self._scan(dir_path)
+        except OSError:
+            with self.lock:
+                self.dirMap.pop(dir_path, None)
+            return None
+        with self.lock:
+            self.nScans += 1
+            if watchDescriptor is not None:
+                self.watchMap[watchDescriptor] = dir_path
+            self.dirMap[dir_path] = {'mtime': mtime, 'scanTime': scanTime, 'checkTime': scanTime, 'names': names,
+                                     'dirty': False, 'watched': watchDescriptor is not None}
+        return names
+
+    # invalidate a directory changed by harvester itself
+    def invalidate(self, dir_path):
+        with self.lock:
+            if dir_path in self.dirMap:
+                self.dirMap[dir_path]['dirty'] = True
+
+    # check if a file exists
+    def exists(self, path):
+        names = self.get_names(os.path.dirname(path))
+        if names is None:
+            return False
+        return os.path.basename(path) in names
+
+    # forget directories under a path
+    def forget(self, dir_path):
+        with self.lock:
+            for tmpPath in list(self.dirMap):
+                if tmpPath == dir_path or tmpPath.startswith(dir_path + os.sep):
+                    del self.dirMap[tmpPath]
+            if self.inotify is not None:
+                for watchDescriptor, tmpPath in list(self.watchMap.items()):
+                    if tmpPath == dir_path or tmpPath.startswith(dir_path + os.sep):
+                        del self.watchMap[watchDescriptor]
+                        try:
+                            self.inotify.rm_watch(watchDescriptor)
+                        except Exception:
+                            pass
+
+
+# directory indexes shared by messenger instances in the process
+_directoryIndexMap = dict()
+_directoryIndexLock = threading.Lock()
+
+
+# get directory index
+def get_directory_index(change_detection, ttl=60):
+    key = (change_detection, ttl)
+    with _directoryIndexLock:
+        if key not in _directoryIndexMap:
+            _directoryIndexMap[key] = DirectoryIndex(use_inotify=(change_detection == 'inotify'), ttl=ttl)
+        return _directoryIndexMap[key]
+
+
 # messenger with shared file system
 class SharedFileMessenger(BaseMessenger):
     # constructor
@@ -162,8 +334,23 @@ class SharedFileMessenger(BaseMessenger):
         self.stripJobParams = False
         self.scanInPostProcess = False
         self.leftOverPatterns = None
+        # None, mtime, or inotify. inotify is valid only when access points are on a local file system
+        self.changeDetection = None
+        # interval in sec to check directories in the index, which should be longer than a check cycle
+        self.indexTTL = 60
         BaseMessenger.__init__(self, **kwarg)
 
+    # check if a payload interaction file exists, using the directory index if enabled
+    def file_exists(self, path):
+        if self.changeDetection is None:
+            return os.path.exists(path)
+        return get_directory_index(self.changeDetection, self.indexTTL).exists(path)
+
+    # invalidate the directory index for a file changed by harvester
+    def invalidate_index(self, path):
+        if self.changeDetection is not None:
+            get_directory_index(self.changeDetection, self.indexTTL).invalidate(os.path.dirname(path))
+
     # get access point
     def get_access_point(self, workspec, panda_id):
         if workspec.mapType == WorkSpec.MT_MultiJobs:
@@ -187,7 +374,7 @@ class SharedFileMessenger(BaseMessenger):
             jsonFilePath = os.path.join(accessPoint, jsonAttrsFileName)
             tmpLog.debug('looking for attributes file {0}'.format(jsonFilePath))
             retDict = dict()
-            if not os.path.exists(jsonFilePath):
+            if not self.file_exists(jsonFilePath):
                 # not found
                 tmpLog.debug('not found attributes file')
             else:
@@ -200,7 +387,7 @@ class SharedFileMessenger(BaseMessenger):
             jsonFilePath = os.path.join(accessPoint, jsonJobReport)
             tmpLog.debug('looking for job report file {0}'.format(jsonFilePath))
             sw_checkjobrep = core_utils.get_stopwatch()
-            if not os.path.exists(jsonFilePath):
+            if not self.file_exists(jsonFilePath):
                 # not found
                 tmpLog.debug('not found job report file')
             else:
@@ -235,11 +422,11 @@ class SharedFileMessenger(BaseMessenger):
             readJsonPath = jsonFilePath + suffixReadJson
             # first look for json.read which is not yet acknowledged
             tmpLog.debug('looking for output file {0}'.format(readJsonPath))
-            if os.path.exists(readJsonPath):
+            if self.file_exists(readJsonPath):
                 pass
             else:
                 tmpLog.debug('looking for output file {0}'.format(jsonFilePath))
-                if not os.path.exists(jsonFilePath):
+                if not self.file_exists(jsonFilePath):
                     # not found
                     tmpLog.debug('not found')
                     continue
@@ -247,6 +434,7 @@ class SharedFileMessenger(BaseMessenger):
                     tmpLog.debug('found')
                     # rename to prevent from being overwritten
                     os.rename(jsonFilePath, readJsonPath)
+                    self.invalidate_index(jsonFilePath)
                 except Exception:
                     tmpLog.error('failed to rename json')
                     continue
@@ -268,8 +456,26 @@ class SharedFileMessenger(BaseMessenger):
             nData = 0
             if not toSkip:
                 sizeMap = dict()
+                statSizeMap = dict()
                 chksumMap = dict()
                 eventsList = dict()
+                # calculate checksums in parallel for files without checksum
+                try:
+                    pfnList = []
+                    for tmpEventMapList in loadDict.values():
+                        if isinstance(tmpEventMapList, list):
+                            pfnList += [tmpEventInfo['path'] for tmpEventInfo in tmpEventMapList
+                                        if 'path' in tmpEventInfo and 'chksum' not in tmpEventInfo]
+                    if len(pfnList) > 0:
+                        sw_chksum = core_utils.get_stopwatch()
+                        for pfn, (fsize, chksum) in iteritems(
+                                core_utils.get_checksum_engine().get_size_and_checksum_bulk(pfnList)):
+                            statSizeMap[pfn] = fsize
+                            chksumMap[pfn] = chksum
+                        tmpLog.debug('calculated checksums for {0} files {1}'.format(len(pfnList),
+                                                                                   sw_chksum.get_elapsed_time()))
+                except Exception:
+                    core_utils.dump_error_message(tmpLog)
                 for tmpPandaID, tmpEventMapList in iteritems(loadDict):
                     tmpPandaID = long(tmpPandaID)
                     # test if tmpEventMapList is a list
@@ -291,6 +497,8 @@ class SharedFileMessenger(BaseMessenger):
                             if pfn not in sizeMap:
                                 if 'fsize' in tmpEventInfo:
                                     sizeMap[pfn] = tmpEventInfo['fsize']
+                                elif pfn in statSizeMap:
+                                    sizeMap[pfn] = statSizeMap[pfn]
                                 else:
                                     sizeMap[pfn] = os.stat(pfn).st_size
                             tmpFileDict['fsize'] = sizeMap[pfn]
@@ -313,7 +521,7 @@ class SharedFileMessenger(BaseMessenger):
                                 if 'chksum' in tmpEventInfo:
                                     chksumMap[pfn] = tmpEventInfo['chksum']
                                 else:
-                                    chksumMap[pfn] = core_utils.calc_adler32(pfn)
+                                    chksumMap[pfn] = core_utils.get_checksum_engine().calc_adler32(pfn)
                             tmpFileDict['chksum'] = chksumMap[pfn]
                             if tmpPandaID not in fileDict:
                                 fileDict[tmpPandaID] = dict()
@@ -339,10 +547,12 @@ class SharedFileMessenger(BaseMessenger):
                         json.dump(eventsList, f)
                         f.close()
                         os.rename(newName, curName)
+                        self.invalidate_index(curName)
             # remove empty file
             if toSkip or nData == 0:
                 try:
                     os.remove(readJsonPath)
+                    self.invalidate_index(readJsonPath)
                 except Exception:
                     pass
             tmpLog.debug('got {0} files for PandaID={1}'.format(nData, pandaID))
@@ -357,7 +567,7 @@ class SharedFileMessenger(BaseMessenger):
         # look for the json just under the access point
         jsonFilePath = os.path.join(workspec.get_access_point(), jsonJobRequestFileName)
         tmpLog.debug('looking for job request file {0}'.format(jsonFilePath))
-        if not os.path.exists(jsonFilePath):
+        if not self.file_exists(jsonFilePath):
             # not found
             tmpLog.debug('not found')
             return False
@@ -416,6 +626,7 @@ class SharedFileMessenger(BaseMessenger):
             jsonFilePath = os.path.join(workspec.get_access_point(), pandaIDsFile)
             with open(jsonFilePath, 'w') as jsonPandaIDsFile:
                 json.dump(pandaIDs, jsonPandaIDsFile)
+            self.invalidate_index(jsonFilePath)
         except Exception:
             core_utils.dump_error_message(tmpLog)
             retVal = False
@@ -423,6 +634,7 @@ class SharedFileMessenger(BaseMessenger):
         try:
             reqFilePath = os.path.join(workspec.get_access_point(), jsonJobRequestFileName)
             os.remove(reqFilePath)
+            self.invalidate_index(reqFilePath)
         except Exception:
             pass
         tmpLog.debug('done')
@@ -437,7 +649,7 @@ class SharedFileMessenger(BaseMessenger):
         # look for the json just under the access point
         jsonFilePath = os.path.join(workspec.get_access_point(), jsonEventsRequestFileName)
         tmpLog.debug('looking for event request file {0}'.format(jsonFilePath))
-        if not os.path.exists(jsonFilePath):
+        if not self.file_exists(jsonFilePath):
             # not found
             tmpLog.debug('not found')
             return {}
@@ -474,6 +686,7 @@ class SharedFileMessenger(BaseMessenger):
         try:
             jsonFilePath = os.path.join(workspec.get_access_point(), jsonEventsRequestFileName)
             os.remove(jsonFilePath)
+            self.invalidate_index(jsonFilePath)
         except Exception:
             pass
         tmpLog.debug('done')
@@ -495,17 +708,18 @@ class SharedFileMessenger(BaseMessenger):
             readJsonPath = jsonFilePath + suffixReadJson
             # first look for json.read which is not yet acknowledged
             tmpLog.debug('looking for event update file {0}'.format(readJsonPath))
-            if os.path.exists(readJsonPath):
+            if self.file_exists(readJsonPath):
                 pass
             else:
                 tmpLog.debug('looking for event update file {0}'.format(jsonFilePath))
-                if not os.path.exists(jsonFilePath):
+                if not self.file_exists(jsonFilePath):
                     # not found
                     tmpLog.debug('not found')
                     continue
                 try:
                     # rename to prevent from being overwritten
                     os.rename(jsonFilePath, readJsonPath)
+                    self.invalidate_index(jsonFilePath)
                 except Exception:
                     tmpLog.error('failed to rename json')
                     continue
@@ -526,6 +740,7 @@ class SharedFileMessenger(BaseMessenger):
             if nData == 0:
                 try:
                     os.remove(readJsonPath)
+                    self.invalidate_index(readJsonPath)
                 except Exception:
                     pass
             tmpLog.debug('got {0} events for PandaID={1}'.format(nData, pandaID))
@@ -545,6 +760,7 @@ class SharedFileMessenger(BaseMessenger):
                 jsonFilePath += suffixReadJson
                 jsonFilePath_rename = jsonFilePath + '.' + str(datetime.datetime.utcnow())
                 os.rename(jsonFilePath, jsonFilePath_rename)
+                self.invalidate_index(jsonFilePath)
             except Exception:
                 pass
             try:
@@ -552,6 +768,7 @@ class SharedFileMessenger(BaseMessenger):
                 jsonFilePath += suffixReadJson
                 jsonFilePath_rename = jsonFilePath + '.' + str(datetime.datetime.utcnow())
                 os.rename(jsonFilePath, jsonFilePath_rename)
+                self.invalidate_index(jsonFilePath)
             except Exception:
                 pass
         tmpLog.debug('done')
@@ -696,7 +913,7 @@ class SharedFileMessenger(BaseMessenger):
         jsonFilePath = os.path.join(workspec.get_access_point(), pandaIDsFile)
         tmpLog.debug('looking for PandaID file {0}'.format(jsonFilePath))
         retVal = []
-        if not os.path.exists(jsonFilePath):
+        if not self.file_exists(jsonFilePath):
             # not found
             tmpLog.debug('not found')
             return retVal
@@ -717,7 +934,7 @@ class SharedFileMessenger(BaseMessenger):
         # look for the json just under the access point
         jsonFilePath = os.path.join(workspec.get_access_point(), killWorkerFile)
         tmpLog.debug('looking for kill request file {0}'.format(jsonFilePath))
-        if not os.path.exists(jsonFilePath):
+        if not self.file_exists(jsonFilePath):
             # not found
             tmpLog.debug('not found')
             return False
@@ -732,7 +949,7 @@ class SharedFileMessenger(BaseMessenger):
         # json file
         jsonFilePath = os.path.join(workspec.get_access_point(), heartbeatFile)
         tmpLog.debug('looking for heartbeat file {0}'.format(jsonFilePath))
-        if not os.path.exists(jsonFilePath): # no heartbeat file was found
+        if not self.file_exists(jsonFilePath): # no heartbeat file was found
             tmpLog.debug('startTime: {0}, now: {1}'.format(workspec.startTime, datetime.datetime.utcnow()))
             if not workspec.startTime:
                 # the worker didn't even have time to start
@@ -767,6 +984,8 @@ class SharedFileMessenger(BaseMessenger):
         # Remove from top directory of access point of worker
         errStr = ''
         worker_accessPoint = workspec.get_access_point()
+        if self.changeDetection is not None:
+            get_directory_index(self.changeDetection, self.indexTTL).forget(worker_accessPoint)
         if os.path.isdir(worker_accessPoint):
             try:
                 shutil.rmtree(worker_accessPoint)
@@ -1,6 +1,9 @@
 import os
 import argparse
 import logging
+import pickle
+
+from concurrent.futures import ThreadPoolExecutor
 
 import rpyc
 import daemon
@@ -37,6 +40,31 @@ class RpcBot(rpyc.Service):
     def on_connect(self, conn):
         self.pluginFactory = PluginFactory(no_db=True)
 
+    ######################
+    # bulk section
+
+    # call methods for workers in bulk. Arguments and return value are pickled to have only one round trip.
+    # call_list is a list of (workspec, [(method_name, args), ...]) and the return value is a map of
+    # {workerID: {method_name: return value}}
+    def exposed_bulk_call(self, plugin_config, pickled_call_list, n_threads=1):
+        core = self.pluginFactory.get_plugin(plugin_config)
+        call_list = pickle.loads(pickled_call_list)
+        def _call_one_worker(workspec_method_list):
+            workspec, method_list = workspec_method_list
+            tmpRetMap = dict()
+            for method_name, args in method_list:
+                try:
+                    tmpRetMap[method_name] = getattr(core, method_name)(workspec, *args)
+                except Exception:
+                    tmpRetMap[method_name] = None
+            return workspec.workerID, tmpRetMap
+        if n_threads > 1:
+            with ThreadPoolExecutor(n_threads) as thread_pool:
+                retList = list(thread_pool.map(_call_one_worker, call_list))
+        else:
+            retList = [_call_one_worker(workspec_method_list) for workspec_method_list in call_list]
+        return pickle.dumps(dict(retList))
+
     ######################
     # submitter section
 
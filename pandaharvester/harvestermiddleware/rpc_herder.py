@@ -1,3 +1,4 @@
+import pickle
 import functools
 
 import rpyc
@@ -46,6 +47,7 @@ class RpcHerder(PluginBase):
         self.jumpPort = getattr(self, 'jumpPort', 22)
         self.remotePort = getattr(self, 'remotePort', 22)
         self.bareFunctions = getattr(self, 'bareFunctions', list())
+        self.nBulkCallThreads = getattr(self, 'nBulkCallThreads', 1)
         # is connected only if ssh forwarding works
         self.is_connected = False
         try:
@@ -69,6 +71,41 @@ class RpcHerder(PluginBase):
                                                                     "allow_delattr": True})
         tmpLog.debug('connected successfully to {0}:{1}'.format(tunnelHost, tunnelPort))
 
+    ######################
+    # bulk section
+
+    # call methods for workers in bulk with one round trip. call_list is a list of
+    # (workspec, [(method_name, args), ...]) and the return value is a map of {workerID: {method_name: return value}}
+    @require_alive
+    def bulk_call(self, call_list):
+        tmpLog = core_utils.make_logger(_logger, method_name='bulk_call')
+        tmpLog.debug('start for {0} workers'.format(len(call_list)))
+        try:
+            ret = dict()
+            remote_call_list = []
+            for workspec, method_list in call_list:
+                ret[workspec.workerID] = dict()
+                remote_method_list = []
+                for method_name, args in method_list:
+                    if self.bareFunctions is not None and method_name in self.bareFunctions:
+                        # bare functions are executed locally
+                        ret[workspec.workerID][method_name] = getattr(self.bare_impl, method_name)(workspec, *args)
+                    else:
+                        remote_method_list.append((method_name, args))
+                if remote_method_list:
+                    remote_call_list.append((workspec, remote_method_list))
+            if remote_call_list:
+                pickled_ret = self.conn.root.bulk_call(self.original_config, pickle.dumps(remote_call_list),
+                                                       self.nBulkCallThreads)
+                for workerID, tmpRetMap in pickle.loads(pickled_ret).items():
+                    ret[workerID].update(tmpRetMap)
+        except Exception:
+            core_utils.dump_error_message(tmpLog)
+            ret = None
+        else:
+            tmpLog.debug('done')
+        return ret
+
     ######################
     # submitter section
 
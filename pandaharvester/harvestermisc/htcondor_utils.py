@@ -58,6 +58,11 @@ CONDOR_JOB_ADS_LIST = [
     'harvesterWorkerID',
 ]
 
+CONDOR_JOB_ADS_SET = set(CONDOR_JOB_ADS_LIST)
+
+# Margin in sec of EnteredCurrentStatus for incremental query of cache, against clock skew of schedd
+CACHE_INCREMENTAL_MARGIN = 300
+
 
 # harvesterID
 harvesterID = harvester_config.master.harvester_id
@@ -88,6 +93,48 @@ def _runShell(cmd):
     return (retCode, stdOut, stdErr)
 
 
+def _parse_job_ads_xml(job_ads_xml_str, attribute_set=None):
+    """
+    Parse XML of one classad <c>...</c> into dict, only with attributes in attribute_set if specified
+    """
+    job_ads_dict = dict()
+    for attribute_xml_element in ET.fromstring(job_ads_xml_str).iter('a'):
+        # Attribute name
+        _n = str(attribute_xml_element.get('n'))
+        if attribute_set is not None and _n not in attribute_set:
+            continue
+        # Attribute value text
+        job_ads_dict[_n] = ' '.join(attribute_xml_element.itertext())
+    return job_ads_dict
+
+
+def iter_job_ads_from_xml(line_iter, attribute_set=None):
+    """
+    Generator of job ads dicts parsed one by one from lines of condor XML output,
+    without keeping the whole output. Anything outside <c>...</c> such as redundant XML roots is skipped
+    """
+    buffer_list = []
+    in_ad = False
+    for line in line_iter:
+        while line:
+            if not in_ad:
+                idx = line.find('<c>')
+                if idx < 0:
+                    break
+                line = line[idx:]
+                in_ad = True
+            idx = line.find('</c>')
+            if idx < 0:
+                buffer_list.append(line)
+                break
+            buffer_list.append(line[:idx+4])
+            line = line[idx+4:]
+            in_ad = False
+            job_ads_xml_str = ''.join(buffer_list)
+            buffer_list = []
+            yield _parse_job_ads_xml(job_ads_xml_str, attribute_set)
+
+
 def condor_job_id_from_workspec(workspec):
     """
     Generate condor job id with schedd host from workspec
@@ -141,6 +188,20 @@ def get_job_id_tuple_from_batchid(batchid):
     return (clusterid, procid)
 
 
+def compact_job_ads(job_ads_dict):
+    """
+    Get tuple of values of CONDOR_JOB_ADS_LIST from condor job dict, with None for missing attributes
+    """
+    return tuple(job_ads_dict.get(_attr) for _attr in CONDOR_JOB_ADS_LIST)
+
+
+def expand_job_ads(job_ads_tuple):
+    """
+    Get condor job dict from tuple of values of CONDOR_JOB_ADS_LIST, without missing attributes
+    """
+    return dict((_attr, _val) for _attr, _val in zip(CONDOR_JOB_ADS_LIST, job_ads_tuple) if _val is not None)
+
+
 # def jdl_to_map(jdl):
 #     """
 #     Transform jdl into dictionary
@@ -353,16 +414,9 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
         'condor_q -xml',
         'condor_history -xml',
     ]
-    # Bad text of redundant xml roots to eleminate from condor XML
-    badtext = """
-</classads>
-
-<?xml version="1.0"?>
-<!DOCTYPE classads SYSTEM "classads.dtd">
-<classads>
-"""
 
-    def __init__(self, cacheEnable=False, cacheRefreshInterval=None, useCondorHistory=True, *args, **kwargs):
+    def __init__(self, cacheEnable=False, cacheRefreshInterval=None, useCondorHistory=True,
+                 cacheFullRefreshInterval=3600, *args, **kwargs):
         self.submissionHost = str(kwargs.get('id'))
         # Make logger
         tmpLog = core_utils.make_logger(baseLogger, 'submissionHost={0} thrid={1} oid={2}'.format(self.submissionHost, get_ident(), id(self)), method_name='CondorJobQuery.__init__')
@@ -373,8 +427,9 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
             # For condor_q cache
             self.cacheEnable = cacheEnable
             if self.cacheEnable:
-                self.cache = ([], 0)
+                self.cache = (None, 0)
                 self.cacheRefreshInterval = cacheRefreshInterval
+                self.cacheFullRefreshInterval = cacheFullRefreshInterval
             self.useCondorHistory = useCondorHistory
             tmpLog.debug('Initialize done')
 
@@ -408,41 +463,49 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
             if 'condor_q' in orig_comStr or ('condor_history' in orig_comStr and batchIDs_set):
                 name_opt = '-name {0}'.format(self.condor_schedd) if self.condor_schedd else ''
                 pool_opt = '-pool {0}'.format(self.condor_pool) if self.condor_pool else ''
+                attr_opt = '-attributes {0}'.format(','.join(CONDOR_JOB_ADS_LIST))
                 ids = batchIDs_str
-                comStr = '{cmd} {name_opt} {pool_opt} {ids}'.format(cmd=orig_comStr,
-                                                                    name_opt=name_opt,
-                                                                    pool_opt=pool_opt,
-                                                                    ids=ids)
+                comStr = '{cmd} {name_opt} {pool_opt} {attr_opt} {ids}'.format(cmd=orig_comStr,
+                                                                               name_opt=name_opt,
+                                                                               pool_opt=pool_opt,
+                                                                               attr_opt=attr_opt,
+                                                                               ids=ids)
             else:
                 # tmpLog.debug('No batch job left to query in this cycle by this thread')
                 continue
             tmpLog.debug('check with {0}'.format(comStr))
-            (retCode, stdOut, stdErr) = _runShell(comStr)
+            # Parse job ads one by one while reading the output, with stderr in a file not to block the command
+            tmp_job_ads_all_dict = {}
+            tmp_batchIDs_set = set()
+            with tempfile.TemporaryFile(mode='w+') as stdErrFile:
+                try:
+                    p = subprocess.Popen(comStr.split(), shell=False, universal_newlines=True,
+                                         stdout=subprocess.PIPE, stderr=stdErrFile)
+                    try:
+                        for job_ads_dict in iter_job_ads_from_xml(p.stdout, CONDOR_JOB_ADS_SET):
+                            batchid = get_batchid_from_job(job_ads_dict)
+                            condor_job_id = '{0}#{1}'.format(self.submissionHost, batchid)
+                            tmp_job_ads_all_dict[condor_job_id] = job_ads_dict
+                            tmp_batchIDs_set.add(batchid)
+                    finally:
+                        # drain the output not to block the command
+                        for _line in p.stdout:
+                            pass
+                        p.stdout.close()
+                        retCode = p.wait()
+                    stdOut = ''
+                except Exception as e:
+                    retCode = 1
+                    stdOut = '{0}: {1}'.format(e.__class__.__name__, e)
+                stdErrFile.seek(0)
+                stdErr = stdErrFile.read()
             if retCode == 0:
                 # Command succeeded
-                job_ads_xml_str = '\n'.join(str(stdOut).split(self.badtext))
-                if '<c>' in job_ads_xml_str:
+                if tmp_job_ads_all_dict:
                     # Found at least one job
-                    # XML parsing
-                    xml_root = ET.fromstring(job_ads_xml_str)
-                    def _getAttribute_tuple(attribute_xml_element):
-                        # Attribute name
-                        _n = str(attribute_xml_element.get('n'))
-                        # Attribute value text
-                        _t = ' '.join(attribute_xml_element.itertext())
-                        return (_n, _t)
-                    # Every batch job
-                    for _c in xml_root.findall('c'):
-                        job_ads_dict = dict()
-                        # Every attribute
-                        attribute_iter = map(_getAttribute_tuple, _c.findall('a'))
-                        job_ads_dict.update(attribute_iter)
-                        batchid = get_batchid_from_job(job_ads_dict)
-                        condor_job_id = '{0}#{1}'.format(self.submissionHost, batchid)
-                        job_ads_all_dict[condor_job_id] = job_ads_dict
-                        # Remove batch jobs already gotten from the list
-                        if batchid in batchIDs_set:
-                            batchIDs_set.discard(batchid)
+                    job_ads_all_dict.update(tmp_job_ads_all_dict)
+                    # Remove batch jobs already gotten from the list
+                    batchIDs_set -= tmp_batchIDs_set
                 else:
                     # Job not found
                     tmpLog.debug('job not found with {0}'.format(comStr))
@@ -472,8 +535,24 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
         # make id sets
         batchIDs_set = set(batchIDs_list)
         clusterids_set = set([get_job_id_tuple_from_batchid(batchid)[0] for batchid in batchIDs_list])
-        # query from cache
+        # query from cache. The cache is a dict of {'jobs': {batchID: tuple of CONDOR_JOB_ADS_LIST values},
+        # 'queryTime': timestamp of the last query, 'fullQueryTime': timestamp of the last full query}
         def cache_query(requirements=None, projection=CONDOR_JOB_ADS_LIST, timeout=60):
+            # put jobs from schedd xquery into dict of cache
+            def fill_jobs(jobs_dict, jobs_iter_orig, batchid_set=None):
+                n_jobs = 0
+                for job in jobs_iter_orig:
+                    try:
+                        job_ads_dict = dict(job)
+                        batchid = get_batchid_from_job(job_ads_dict)
+                    except Exception as e:
+                        tmpLog.error('In updating cache schedd xquery; got exception {0}: {1} ; {2}'.format(
+                                        e.__class__.__name__, e, repr(job)))
+                        continue
+                    if batchid_set is None or batchid in batchid_set:
+                        jobs_dict[batchid] = compact_job_ads(job_ads_dict)
+                        n_jobs += 1
+                return n_jobs
             # query from condor xquery and update cache to fifo
             def update_cache(lockInterval=90):
                 tmpLog.debug('update_cache')
@@ -483,24 +562,59 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
                 if lock_key is not None:
                     # acquired lock, update from condor schedd
                     tmpLog.debug('got lock, updating cache')
-                    jobs_iter_orig = self.schedd.xquery(requirements=requirements, projection=projection)
-                    jobs_iter = []
-                    for job in jobs_iter_orig:
-                        try:
-                            jobs_iter.append(dict(job))
-                        except Exception as e:
-                            tmpLog.error('In updating cache schedd xquery; got exception {0}: {1} ; {2}'.format(
-                                            e.__class__.__name__, e, repr(job)))
                     timeNow = time.time()
-                    cache_fifo.put(jobs_iter, timeNow)
-                    self.cache = (jobs_iter, timeNow)
+                    base_obj = self.cache[0]
+                    if isinstance(base_obj, dict) \
+                            and timeNow - base_obj['fullQueryTime'] < self.cacheFullRefreshInterval:
+                        # incremental update based on the local cache
+                        jobs_dict = dict(base_obj['jobs'])
+                        # batchIDs of jobs still in the queue
+                        queued_batchid_set = set()
+                        for job in self.schedd.xquery(requirements=requirements, projection=['ClusterId', 'ProcId']):
+                            try:
+                                queued_batchid_set.add(get_batchid_from_job(job))
+                            except Exception:
+                                pass
+                        # remove jobs which left the queue, to be checked with condor history later
+                        n_removed = 0
+                        for batchid in list(jobs_dict):
+                            if batchid not in queued_batchid_set:
+                                del jobs_dict[batchid]
+                                n_removed += 1
+                        # jobs changed since the last query
+                        changed_requirements = '({0}) && EnteredCurrentStatus >= {1}'.format(
+                                                requirements, int(base_obj['queryTime'] - CACHE_INCREMENTAL_MARGIN))
+                        n_updated = fill_jobs(jobs_dict, self.schedd.xquery(requirements=changed_requirements,
+                                                                            projection=projection))
+                        # new jobs missed due to clock skew
+                        missing_batchid_set = queued_batchid_set - set(jobs_dict)
+                        if missing_batchid_set:
+                            missing_clusterids_str = ','.join(set([get_job_id_tuple_from_batchid(batchid)[0]
+                                                                   for batchid in missing_batchid_set]))
+                            missing_requirements = 'member(ClusterID, {{{0}}})'.format(missing_clusterids_str)
+                            n_updated += fill_jobs(jobs_dict, self.schedd.xquery(requirements=missing_requirements,
+                                                                                 projection=projection),
+                                                   missing_batchid_set)
+                        fullQueryTime = base_obj['fullQueryTime']
+                        tmpLog.debug('incremental update; {0} removed, {1} updated or added, {2} in total'.format(
+                                        n_removed, n_updated, len(jobs_dict)))
+                    else:
+                        # full update
+                        jobs_dict = dict()
+                        fill_jobs(jobs_dict, self.schedd.xquery(requirements=requirements, projection=projection))
+                        fullQueryTime = timeNow
+                        tmpLog.debug('full update; {0} in total'.format(len(jobs_dict)))
+                    cache_obj = {'jobs': jobs_dict, 'queryTime': timeNow, 'fullQueryTime': fullQueryTime}
+                    timeNow = time.time()
+                    cache_fifo.put(cache_obj, timeNow)
+                    self.cache = (cache_obj, timeNow)
                     # release lock
                     retVal = cache_fifo.unlock(key=lock_key)
                     if retVal:
                         tmpLog.debug('done update cache and unlock')
                     else:
                         tmpLog.warning('cannot unlock... Maybe something wrong')
-                    return jobs_iter
+                    return cache_obj
                 else:
                     tmpLog.debug('cache fifo locked by other thread. Skipped')
                     return None
@@ -532,7 +646,7 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
                         break
                 tmpLog.debug('cleaned up {0} objects in cache fifo'.format(n_cleanup))
             # start
-            jobs_iter = tuple()
+            cache_obj = None
             try:
                 attempt_timestamp = time.time()
                 while True:
@@ -561,7 +675,7 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
                             if _last_update >= peeked_tuple.score:
                                 # valid local cache
                                 tmpLog.debug('valid local cache')
-                                jobs_iter = _obj
+                                cache_obj = _obj
                             else:
                                 # valid fifo cache
                                 tmpLog.debug('update local cache from fifo')
@@ -569,8 +683,13 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
                                 if peeked_tuple_with_item is not None \
                                     and peeked_tuple.id != cache_fifo.global_lock_id \
                                     and peeked_tuple_with_item.item is not None:
-                                    jobs_iter = cache_fifo.decode(peeked_tuple_with_item.item)
-                                    self.cache = (jobs_iter, peeked_tuple_with_item.score)
+                                    cache_obj = cache_fifo.decode(peeked_tuple_with_item.item)
+                                    if not isinstance(cache_obj, dict):
+                                        # list of job dicts by older versions
+                                        jobs_dict = dict()
+                                        fill_jobs(jobs_dict, cache_obj)
+                                        cache_obj = {'jobs': jobs_dict, 'queryTime': 0, 'fullQueryTime': 0}
+                                    self.cache = (cache_obj, peeked_tuple_with_item.score)
                                 else:
                                     tmpLog.debug('peeked invalid cache fifo object. Wait and retry...')
                                     time.sleep(random.uniform(1, 5))
@@ -580,7 +699,7 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
                             tmpLog.debug('update cache in fifo')
                             retVal = update_cache()
                             if retVal is not None:
-                                jobs_iter = retVal
+                                cache_obj = retVal
                             cleanup_cache()
                         break
                     else:
@@ -591,7 +710,7 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
                                 tmpLog.debug('waited enough, update cache in fifo')
                                 retVal = update_cache()
                                 if retVal is not None:
-                                    jobs_iter = retVal
+                                    cache_obj = retVal
                                 break
                             else:
                                 # still nothing, wait
@@ -600,7 +719,9 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
             except Exception as _e:
                 tb_str = traceback.format_exc()
                 tmpLog.error('Error querying from cache fifo; {0} ; {1}'.format(_e, tb_str))
-            return jobs_iter
+            if cache_obj is None:
+                return dict()
+            return cache_obj['jobs']
         # query method options
         query_method_list = [self.schedd.xquery]
         if self.cacheEnable:
@@ -620,6 +741,22 @@ class CondorJobQuery(six.with_metaclass(SingletonWithID, CondorClient)):
             else:
                 tmpLog.debug('Query method: {0} ; clusterids: "{1}"'.format(query_method.__name__, clusterids_str))
             # Query
+            if query_method is cache_query:
+                # look up only the batch jobs in the cache
+                jobs_dict = cache_query(requirements=requirements, projection=CONDOR_JOB_ADS_LIST)
+                if allJobs:
+                    batchid_list = list(jobs_dict)
+                else:
+                    batchid_list = [batchid for batchid in batchIDs_set if batchid in jobs_dict]
+                for batchid in batchid_list:
+                    condor_job_id = '{0}#{1}'.format(self.submissionHost, batchid)
+                    job_ads_all_dict[condor_job_id] = expand_job_ads(jobs_dict[batchid])
+                    # Remove batch jobs already gotten from the list
+                    if not allJobs:
+                        batchIDs_set.discard(batchid)
+                if len(batchIDs_set) == 0 or allJobs:
+                    break
+                continue
             jobs_iter = query_method(requirements=requirements, projection=CONDOR_JOB_ADS_LIST)
             for job in jobs_iter:
                 try:
@@ -662,7 +799,7 @@ class CondorJobSubmit(six.with_metaclass(SingletonWithID, CondorClient)):
         CondorClient.__init__(self, self.submissionHost, *args, **kwargs)
         tmpLog.debug('Initialize done')
 
-    def submit(self, jdl_list, use_spool=False):
+    def submit(self, jdl_list, use_spool=False, timeout=None):
         # Make logger
         tmpLog = core_utils.make_logger(baseLogger, 'submissionHost={0}'.format(self.submissionHost), method_name='CondorJobSubmit.submit')
         # Get all
@@ -675,15 +812,15 @@ class CondorJobSubmit(six.with_metaclass(SingletonWithID, CondorClient)):
                 # TODO: Fall back to submit_with_command for now
                 # retVal = self.submit_with_python(jdl_list, use_spool)
                 # retVal = self.submit_with_python_proces(jdl_list, use_spool)
-                retVal = self.submit_with_command(jdl_list, use_spool)
+                retVal = self.submit_with_command(jdl_list, use_spool, timeout=timeout)
             except Exception as e:
                 tmpLog.error('Exception {0}: {1}'.format(e.__class__.__name__, e))
                 raise
         else:
-            retVal = self.submit_with_command(jdl_list, use_spool)
+            retVal = self.submit_with_command(jdl_list, use_spool, timeout=timeout)
         return retVal
 
-    def submit_with_command(self, jdl_list, use_spool=False, tmp_str='', keep_temp_sdf=False):
+    def submit_with_command(self, jdl_list, use_spool=False, tmp_str='', keep_temp_sdf=False, timeout=None):
         # Make logger
         tmpLog = core_utils.make_logger(baseLogger, 'submissionHost={0}'.format(self.submissionHost), method_name='CondorJobSubmit.submit_with_command')
         # Initialize
@@ -708,7 +845,18 @@ class CondorJobSubmit(six.with_metaclass(SingletonWithID, CondorClient)):
             p = subprocess.Popen(comStr.split(), shell=False, universal_newlines=True,
                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE)
             # check return code
-            stdOut, stdErr = p.communicate()
+            if timeout is None:
+                stdOut, stdErr = p.communicate()
+            else:
+                try:
+                    stdOut, stdErr = p.communicate(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    # kill the command not to block submission of other workers
+                    p.kill()
+                    stdOut, stdErr = p.communicate()
+                    errStr = 'condor_submit timed out after {0} sec'.format(timeout)
+                    # remove jobs which may have been committed to schedd, since workers are regarded as failed
+                    self.remove_timed_out_jobs(jdl_list, timeout)
             retCode = p.returncode
         except Exception as e:
             stdOut = ''
@@ -738,6 +886,54 @@ class CondorJobSubmit(six.with_metaclass(SingletonWithID, CondorClient)):
         # Return
         return (batchIDs_list, errStr)
 
+    def remove_timed_out_jobs(self, jdl_list, timeout=None):
+        # Make logger
+        tmpLog = core_utils.make_logger(baseLogger, 'submissionHost={0}'.format(self.submissionHost), method_name='CondorJobSubmit.remove_timed_out_jobs')
+        # identify jobs with harvesterWorkerID in jdls
+        workerIDs_list = []
+        for jdl in jdl_list:
+            workerid_match = re.search('^\s*\+harvesterWorkerID\s*=\s*"?(\w+)"?', jdl, re.M)
+            if workerid_match:
+                workerIDs_list.append(workerid_match.group(1))
+        if len(workerIDs_list) < len(jdl_list):
+            tmpLog.warning('cannot identify jobs without harvesterWorkerID in sdf; '
+                           'jobs submitted by the killed condor_submit may be left in schedd')
+        if not workerIDs_list:
+            return False
+        # make condor remote options
+        opt_list = []
+        if self.condor_schedd:
+            opt_list += ['-name', self.condor_schedd]
+        if self.condor_pool:
+            opt_list += ['-pool', self.condor_pool]
+        constraint = 'harvesterID =?= "{0}" && stringListMember(harvesterWorkerID, "{1}")'.format(
+                        harvesterID, ','.join(workerIDs_list))
+        com_list = ['condor_rm'] + opt_list + ['-constraint', constraint]
+        tmpLog.debug('remove with command: {0}'.format(' '.join(com_list)))
+        try:
+            p = subprocess.Popen(com_list, shell=False, universal_newlines=True,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if timeout is None:
+                stdOut, stdErr = p.communicate()
+            else:
+                try:
+                    stdOut, stdErr = p.communicate(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    p.kill()
+                    stdOut, stdErr = p.communicate()
+            retCode = p.returncode
+        except Exception:
+            stdOut = ''
+            stdErr = core_utils.dump_error_message(tmpLog, no_message=True)
+            retCode = 1
+        # condor_rm fails also when no job matches, i.e., nothing was committed
+        if retCode == 0:
+            tmpLog.info('removed jobs of workerIDs={0} : {1}'.format(','.join(workerIDs_list), stdOut.strip()))
+            return True
+        tmpLog.warning('failed or nothing to remove for workerIDs={0} ; retCode={1} : {2} {3}'.format(
+                        ','.join(workerIDs_list), retCode, stdOut.strip(), stdErr.strip()))
+        return False
+
     @CondorClient.renew_session_and_retry
     def submit_with_python(self, jdl_list, use_spool=False):
         # Make logger
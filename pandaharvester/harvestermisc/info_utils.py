@@ -1,6 +1,7 @@
 from future.utils import iteritems
 
 from pandaharvester.harvesterconfig import harvester_config
+from pandaharvester.harvestercore import core_utils
 from pandaharvester.harvestercore.plugin_base import PluginBase
 from pandaharvester.harvestercore.db_interface import DBInterface
 
@@ -17,17 +18,11 @@ class PandaQueuesDict(dict, PluginBase):
         PluginBase.__init__(self, **kwarg)
         dbInterface = DBInterface()
         cacher_key = kwarg.get('cacher_key', 'panda_queues.json')
-        panda_queues_cache = dbInterface.get_cache(cacher_key)
-        if panda_queues_cache and isinstance(panda_queues_cache.data, dict):
-            panda_queues_dict = panda_queues_cache.data
-            for (k, v) in iteritems(panda_queues_dict):
-                try:
-                    panda_resource = v['panda_resource']
-                    assert k == v['nickname']
-                except Exception:
-                    pass
-                else:
-                    self[panda_resource] = v
+        core_utils.get_cache_store().register_view_builder(cacher_key, core_utils.make_panda_queues_views)
+        self.views = dbInterface.get_cache_views(cacher_key)
+        if self.views is None:
+            self.views = core_utils.make_panda_queues_views(None)
+        dict.update(self, self.views['queueDict'])
 
     def __getitem__(self, panda_resource):
         if panda_resource in self:
@@ -53,6 +48,27 @@ class PandaQueuesDict(dict, PluginBase):
         except Exception:
             return None
 
+    # get value of a view with either PanDA Queue name or PanDA Resource name
+    def _get_view_value(self, view_name, panda_resource, default=None):
+        panda_queue = self.views['queueName'].get(panda_resource, panda_resource)
+        return self.views[view_name].get(panda_queue, default)
+
+    # get dict of active CEs. CE endpoint -> CE dict. Not to be modified since shared
+    def get_active_ces(self, panda_resource):
+        return self._get_view_value('activeCEs', panda_resource, dict())
+
+    # get corecount
+    def get_corecount(self, panda_resource):
+        return self._get_view_value('corecount', panda_resource, 1)
+
+    # get pilot version
+    def get_pilot_version(self, panda_resource):
+        return self._get_view_value('pilotVersion', panda_resource, '')
+
+    # get capability
+    def get_capability(self, panda_resource):
+        return self._get_view_value('capability', panda_resource, '')
+
     # get queue status for auto blacklisting
     def get_queue_status(self, panda_resource):
         panda_queue_dict = self.get(panda_resource)
@@ -171,6 +171,10 @@ def _check_one_worker(workspec, job_ads_all_dict, cancel_unknown=False, held_tim
 
 # monitor for HTCONDOR batch system
 class HTCondorMonitor(PluginBase):
+    # instances are reused and shared by threads since they don't keep per-call state
+    isReusable = True
+    isThreadSafe = True
+
     # constructor
     def __init__(self, **kwarg):
         PluginBase.__init__(self, **kwarg)
@@ -196,6 +200,10 @@ class HTCondorMonitor(PluginBase):
             self.cacheRefreshInterval = harvester_config.monitor.pluginCacheRefreshInterval
         except AttributeError:
             self.cacheRefreshInterval = harvester_config.monitor.checkInterval
+        try:
+            self.cacheFullRefreshInterval = harvester_config.monitor.pluginCacheFullRefreshInterval
+        except AttributeError:
+            self.cacheFullRefreshInterval = 3600
         try:
             self.useCondorHistory
         except AttributeError:
@@ -214,6 +222,7 @@ class HTCondorMonitor(PluginBase):
             try:
                 job_query = CondorJobQuery( cacheEnable=self.cacheEnable,
                                             cacheRefreshInterval=self.cacheRefreshInterval,
+                                            cacheFullRefreshInterval=self.cacheFullRefreshInterval,
                                             useCondorHistory=self.useCondorHistory,
                                             id=submissionHost)
                 host_job_ads_dict = job_query.get_all(batchIDs_list=batchIDs_list)
@@ -246,6 +255,7 @@ class HTCondorMonitor(PluginBase):
             try:
                 job_query = CondorJobQuery( cacheEnable=self.cacheEnable,
                                             cacheRefreshInterval=self.cacheRefreshInterval,
+                                            cacheFullRefreshInterval=self.cacheFullRefreshInterval,
                                             useCondorHistory=self.useCondorHistory,
                                             id=submissionHost)
                 job_ads_all_dict.update(job_query.get_all(allJobs=True))
@@ -17,6 +17,9 @@ baseLogger = core_utils.setup_logger('k8s_monitor')
 
 # monitor for K8S
 class K8sMonitor(PluginBase):
+    # instances are reused per thread since pod list is cached in the instance
+    isReusable = True
+
     # constructor
     def __init__(self, **kwarg):
         PluginBase.__init__(self, **kwarg)
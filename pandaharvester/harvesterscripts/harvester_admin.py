@@ -109,11 +109,14 @@ def get(arguments):
 def fifo_benchmark(arguments):
     n_object = arguments.n_object
     n_thread = arguments.n_thread
+    n_batch = arguments.n_batch
     mq = harvesterFifos.BenchmarkFIFO()
     sw = core_utils.get_stopwatch()
     sum_dict = {
                 'put_n' : 0,
                 'put_time' : 0.0,
+                'putmany_n' : 0,
+                'putmany_time' : 0.0,
                 'get_time' : 0.0,
                 'get_protective_time' : 0.0,
                 'clear_time' : 0.0,
@@ -124,6 +127,15 @@ def fifo_benchmark(arguments):
         data = {'random': [(i_index**2) % 2**16, random.random()]}
         workspec.workAttributes = data
         mq.put(workspec)
+    def _put_many_objects(i_batch):
+        workspec_list = []
+        for i_index in range(i_batch * n_batch, min((i_batch + 1) * n_batch, n_object)):
+            workspec = WorkSpec()
+            workspec.workerID = i_index
+            data = {'random': [(i_index**2) % 2**16, random.random()]}
+            workspec.workAttributes = data
+            workspec_list.append(workspec)
+        mq.putmany(workspec_list)
     def _get_object(i_index):
         return mq.get(timeout=3, protective=False)
     def _get_object_protective(i_index):
@@ -135,6 +147,13 @@ def fifo_benchmark(arguments):
         sum_dict['put_n'] += 1
         print('Put {0} objects by {1} threads'.format(n_object, n_thread) + sw.get_elapsed_time())
         print('Now fifo size is {0}'.format(mq.size()))
+    def putmany_test():
+        sw.reset()
+        multithread_executer(_put_many_objects, (n_object + n_batch - 1) // n_batch, n_thread)
+        sum_dict['putmany_time'] += sw.get_elapsed_time_in_sec(True)
+        sum_dict['putmany_n'] += 1
+        print('Put {0} objects in batches of {1} by {2} threads'.format(n_object, n_batch, n_thread) + sw.get_elapsed_time())
+        print('Now fifo size is {0}'.format(mq.size()))
     def get_test():
         sw.reset()
         multithread_executer(_get_object, n_object, n_thread)
@@ -163,15 +182,22 @@ def fifo_benchmark(arguments):
     get_protective_test()
     put_test()
     clear_test()
+    putmany_test()
+    get_test()
+    putmany_test()
+    clear_test()
     print('Finished fifo benchmark')
     # summary
     print('Summary:')
     print('FIFO plugin is: {0}'.format(mq.fifo.__class__.__name__))
     print('Benchmark with {0} objects by {1} threads'.format(n_object, n_thread))
     print('Put            : {0:.3f} ms / obj'.format(1000. * sum_dict['put_time']/(sum_dict['put_n']*n_object)))
+    print('Putmany        : {0:.3f} ms / obj (batch of {1})'.format(1000. * sum_dict['putmany_time']/(sum_dict['putmany_n']*n_object), n_batch))
     print('Get            : {0:.3f} ms / obj'.format(1000. * sum_dict['get_time']/n_object))
     print('Get protective : {0:.3f} ms / obj'.format(1000. * sum_dict['get_protective_time']/n_object))
     print('Clear          : {0:.3f} ms / obj'.format(1000. * sum_dict['clear_time']/n_object))
+    print('Put            : {0:.1f} obj / sec'.format(sum_dict['put_n']*n_object/sum_dict['put_time']))
+    print('Putmany        : {0:.1f} obj / sec'.format(sum_dict['putmany_n']*n_object/sum_dict['putmany_time']))
 
 def fifo_repopulate(arguments):
     if 'ALL' in arguments.name_list:
@@ -299,6 +325,7 @@ def main():
     fifo_benchmark_parser.set_defaults(which='fifo_benchmark')
     fifo_benchmark_parser.add_argument('-n', type=int, dest='n_object', action='store', default=500, metavar='<N>', help='Benchmark with N objects')
     fifo_benchmark_parser.add_argument('-t', type=int, dest='n_thread', action='store', default=1, metavar='<N>', help='Benchmark with N threads')
+    fifo_benchmark_parser.add_argument('-b', type=int, dest='n_batch', action='store', default=100, metavar='<N>', help='Benchmark bulk put with batches of N objects')
     # fifo repopuate command
     fifo_repopulate_parser = fifo_subparsers.add_parser('repopulate', help='Repopulate agent fifo')
     fifo_repopulate_parser.set_defaults(which='fifo_repopulate')
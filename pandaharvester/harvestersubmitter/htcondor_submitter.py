@@ -1,5 +1,7 @@
 import os
+import time
 import errno
+import string
 import datetime
 import tempfile
 import threading
@@ -161,6 +163,108 @@ def _get_ce_stats_weighting_display(ce_list, worker_ce_all_tuple, ce_weighting):
     return stats_weighting_display_str
 
 
+# Submit description file template pre-parsed for fast formatting
+class _SdfTemplate(object):
+    def __init__(self, template_raw):
+        # get batch_log, stdout, stderr filename, and remove commented lines
+        self.batch_log_value = None
+        self.stdout_value = None
+        self.stderr_value = None
+        sdf_template_str_list = []
+        for _line in template_raw.split('\n'):
+            if _line.startswith('#'):
+                continue
+            sdf_template_str_list.append(_line)
+            _match_batch_log = re.match('log = (.+)', _line)
+            _match_stdout = re.match('output = (.+)', _line)
+            _match_stderr = re.match('error = (.+)', _line)
+            if _match_batch_log:
+                self.batch_log_value = _match_batch_log.group(1)
+                continue
+            if _match_stdout:
+                self.stdout_value = _match_stdout.group(1)
+                continue
+            if _match_stderr:
+                self.stderr_value = _match_stderr.group(1)
+                continue
+        self.template = '\n'.join(sdf_template_str_list)
+        # split into literal texts and replacement fields. Fall back to str.format for anything but
+        # plain keyword fields, such as positional or indexed fields and nested format specs
+        self.pieces = []
+        self.is_simple = True
+        try:
+            for literal_text, field_name, format_spec, conversion in string.Formatter().parse(self.template):
+                if field_name is not None \
+                        and (not re.match('^[A-Za-z_]\w*$', field_name) or '{' in format_spec):
+                    self.is_simple = False
+                    break
+                self.pieces.append((literal_text, field_name, format_spec, conversion))
+        except ValueError:
+            self.is_simple = False
+
+    # fill in the template as str.format does
+    def format(self, **kwarg):
+        if not self.is_simple:
+            return self.template.format(**kwarg)
+        str_list = []
+        for literal_text, field_name, format_spec, conversion in self.pieces:
+            str_list.append(literal_text)
+            if field_name is None:
+                continue
+            value = kwarg[field_name]
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 's':
+                value = str(value)
+            elif conversion is not None:
+                value = ascii(value)
+            str_list.append(format(value, format_spec))
+        return ''.join(str_list)
+
+
+# cache of sdf templates; file name -> ((mtime, size), template)
+_sdf_template_cache = dict()
+_sdf_template_cache_lock = threading.Lock()
+
+
+# get a pre-parsed sdf template, which is read again only when the file is changed
+def _get_sdf_template(file_name):
+    tmpStat = os.stat(file_name)
+    fileVersion = (tmpStat.st_mtime, tmpStat.st_size)
+    with _sdf_template_cache_lock:
+        if file_name in _sdf_template_cache and _sdf_template_cache[file_name][0] == fileVersion:
+            return _sdf_template_cache[file_name][1]
+    with open(file_name) as tmpFile:
+        sdf_template = _SdfTemplate(tmpFile.read())
+    with _sdf_template_cache_lock:
+        _sdf_template_cache[file_name] = (fileVersion, sdf_template)
+    return sdf_template
+
+
+# thread pool to dump sdf files of workers in the background
+_sdf_dump_pool = None
+_sdf_dump_pool_lock = threading.Lock()
+
+
+# dump a sdf file of a worker
+def _dump_sdf(sdf_path, jdl_str):
+    tmpLog = core_utils.make_logger(baseLogger, method_name='_dump_sdf')
+    try:
+        with open(sdf_path, 'w') as tmpFile:
+            tmpFile.write(jdl_str)
+    except Exception:
+        core_utils.dump_error_message(tmpLog)
+
+
+# dump a sdf file of a worker in the background
+def _dump_sdf_async(sdf_path, jdl_str):
+    global _sdf_dump_pool
+    with _sdf_dump_pool_lock:
+        if _sdf_dump_pool is None:
+            _sdf_dump_pool = ThreadPoolExecutor(2)
+    _sdf_dump_pool.submit(_dump_sdf, sdf_path, jdl_str)
+
+
 # Replace condor Marco from SDF file, return string
 def _condor_macro_replace(string, **kwarg):
     new_string = string
@@ -213,8 +317,46 @@ def _get_prodsourcelabel_pilotypeopt_piloturlstr(pilot_type, pilot_version='1'):
     return pilot_opt_tuple
 
 
+# statistics of submission per submissionHost, which can be used to weight schedds
+_schedd_submit_stats = dict()
+_schedd_submit_stats_lock = threading.Lock()
+
+
+# record a submission to a submissionHost
+def _record_schedd_submit(host, n_submitted, time_consumed):
+    with _schedd_submit_stats_lock:
+        if host not in _schedd_submit_stats:
+            _schedd_submit_stats[host] = {'nSubmissions': 0, 'nFailures': 0, 'nWorkers': 0,
+                                          'totalTime': 0., 'lastLatency': None, 'avgLatency': None}
+        stats = _schedd_submit_stats[host]
+        stats['nSubmissions'] += 1
+        if not n_submitted:
+            stats['nFailures'] += 1
+        stats['nWorkers'] += n_submitted
+        stats['totalTime'] += time_consumed
+        stats['lastLatency'] = time_consumed
+        # exponential moving average
+        if stats['avgLatency'] is None:
+            stats['avgLatency'] = time_consumed
+        else:
+            stats['avgLatency'] = 0.8 * stats['avgLatency'] + 0.2 * time_consumed
+
+
+# get statistics of submission per submissionHost. Throughput is in workers per second
+def get_schedd_submit_stats():
+    retMap = dict()
+    with _schedd_submit_stats_lock:
+        for host, stats in _schedd_submit_stats.items():
+            retMap[host] = dict(stats)
+            if stats['totalTime'] > 0:
+                retMap[host]['throughput'] = stats['nWorkers'] / stats['totalTime']
+            else:
+                retMap[host]['throughput'] = None
+    return retMap
+
+
 # submit a bag of workers
-def submit_bag_of_workers(data_list):
+def submit_bag_of_workers(data_list, n_threads=1, timeout=None):
     # make logger
     tmpLog = core_utils.make_logger(baseLogger, method_name='submit_bag_of_workers')
     # keep order of workers in data_list
@@ -240,7 +382,8 @@ def submit_bag_of_workers(data_list):
         try:
             ce_info_dict = data['ce_info_dict']
             batch_log_dict = data['batch_log_dict']
-            use_spool = data['use_spool']
+            # only check existence since use_spool is taken from worker_data_map per host
+            data['use_spool']
         except KeyError:
             errStr = '{0} not submitted due to incomplete data of the worker'.format(workerID)
             tmpLog.warning(errStr)
@@ -256,19 +399,38 @@ def submit_bag_of_workers(data_list):
                 host_jdl_list_workerid_map[workspec.submissionHost].append(val)
             except KeyError:
                 host_jdl_list_workerid_map[workspec.submissionHost] = [val]
-    # loop over submissionHost
-    for host, val_list in host_jdl_list_workerid_map.items():
+    # submit to one submissionHost
+    def _submit_one_host(host_val_list):
+        host, val_list = host_val_list
         # make jdl string of workers
         jdl_list = [ val[1] for val in val_list ]
+        use_spool = worker_data_map[val_list[0][0].workerID]['use_spool']
         # condor job submit object
         tmpLog.debug('submitting to submissionHost={0}'.format(host))
         # submit
+        time_point = time.time()
         try:
             condor_job_submit = CondorJobSubmit(id=host)
-            batchIDs_list, ret_err_str = condor_job_submit.submit(jdl_list, use_spool=use_spool)
+            batchIDs_list, ret_err_str = condor_job_submit.submit(jdl_list, use_spool=use_spool, timeout=timeout)
         except Exception as e:
             batchIDs_list = None
             ret_err_str = 'Exception {0}: {1}'.format(e.__class__.__name__, e)
+        time_consumed = time.time() - time_point
+        n_submitted = len(batchIDs_list) if batchIDs_list else 0
+        _record_schedd_submit(host, n_submitted, time_consumed)
+        tmpLog.debug('took {0:.3f} sec for {1} workers to submissionHost={2}'.format(time_consumed,
+                                                                                    len(val_list), host))
+        return host, val_list, batchIDs_list, ret_err_str
+    # submit to submissionHosts concurrently
+    host_val_list_list = list(host_jdl_list_workerid_map.items())
+    n_threads = max(min(n_threads, len(host_val_list_list)), 1)
+    if n_threads > 1:
+        with ThreadPoolExecutor(n_threads) as thread_pool:
+            submit_result_list = list(thread_pool.map(_submit_one_host, host_val_list_list))
+    else:
+        submit_result_list = [ _submit_one_host(host_val_list) for host_val_list in host_val_list_list ]
+    # loop over submissionHost
+    for host, val_list, batchIDs_list, ret_err_str in submit_result_list:
         # result
         if batchIDs_list:
             # submitted
@@ -327,7 +489,8 @@ def submit_bag_of_workers(data_list):
 # make a condor jdl for a worker
 def make_a_jdl(workspec, template, n_core_per_node, log_dir, panda_queue_name, executable_file,
                 x509_user_proxy, log_subdir=None, ce_info_dict=dict(), batch_log_dict=dict(),
-                special_par='', harvester_queue_config=None, is_unified_queue=False, pilot_version='1', **kwarg):
+                special_par='', harvester_queue_config=None, is_unified_queue=False, pilot_version='1',
+                sdf_dump_mode='sync', **kwarg):
     # make logger
     tmpLog = core_utils.make_logger(baseLogger, 'workerID={0}'.format(workspec.workerID),
                                     method_name='make_a_jdl')
@@ -369,11 +532,16 @@ def make_a_jdl(workspec, template, n_core_per_node, log_dir, panda_queue_name, e
         pilot_url_str = ''
     else:
         prod_source_label, pilot_type_opt, pilot_url_str = pilot_opt_tuple
-    # open tmpfile as submit description file
-    tmpFile = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='_submit.sdf', dir=workspec.get_access_point())
+    # open tmpfile as submit description file, or only decide its name when dumped later
+    if sdf_dump_mode == 'sync':
+        tmpFile = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='_submit.sdf',
+                                              dir=workspec.get_access_point())
+        sdf_path = tmpFile.name
+    else:
+        sdf_path = os.path.join(workspec.get_access_point(), '{0}_submit.sdf'.format(workspec.workerID))
     # fill in template string
     jdl_str = template.format(
-        sdfPath=tmpFile.name,
+        sdfPath=sdf_path,
         executableFile=executable_file,
         nCorePerNode=n_core_per_node,
         nCoreTotal=n_core_total,
@@ -408,9 +576,13 @@ def make_a_jdl(workspec, template, n_core_per_node, log_dir, panda_queue_name, e
         pilotUrlOption=pilot_url_str,
         )
     # save jdl to submit description file
-    tmpFile.write(jdl_str)
-    tmpFile.close()
-    tmpLog.debug('saved sdf at {0}'.format(tmpFile.name))
+    if sdf_dump_mode == 'sync':
+        tmpFile.write(jdl_str)
+        tmpFile.close()
+        tmpLog.debug('saved sdf at {0}'.format(sdf_path))
+    elif sdf_dump_mode == 'async':
+        _dump_sdf_async(sdf_path, jdl_str)
+        tmpLog.debug('saving sdf at {0} in the background'.format(sdf_path))
     tmpLog.debug('done')
     return jdl_str
 
@@ -434,6 +606,10 @@ def parse_batch_job_filename(value_str, file_dir, batchID, guess=False):
 
 # submitter for HTCONDOR batch system
 class HTCondorSubmitter(PluginBase):
+    # instances are reused and shared by threads since they don't keep per-call state
+    isReusable = True
+    isThreadSafe = True
+
     # constructor
     def __init__(self, **kwarg):
         self.logBaseURL = None
@@ -497,6 +673,24 @@ class HTCondorSubmitter(PluginBase):
             self.minBulkToRamdomizedSchedd
         except AttributeError:
             self.minBulkToRamdomizedSchedd = 20
+        # max number of threads to submit to multiple schedds concurrently
+        try:
+            self.nScheddSubmitThreads
+        except AttributeError:
+            self.nScheddSubmitThreads = 4
+        # timeout in sec of submission to each schedd. None for no timeout. condor_submit may have committed the
+        # cluster to schedd when it is killed due to timeout. Such jobs are removed with condor_rm by
+        # +harvesterID and +harvesterWorkerID in sdf, so that the timeout should not be used with sdf templates
+        # which don't define them, otherwise pilots would run without being tracked by harvester
+        try:
+            self.scheddSubmitTimeout
+        except AttributeError:
+            self.scheddSubmitTimeout = None
+        # how to dump submit description file of each worker; sync, async, or none
+        try:
+            self.sdfDumpMode
+        except AttributeError:
+            self.sdfDumpMode = 'sync'
         # record of information of CE statistics
         self.ceStatsLock = threading.Lock()
         self.ceStats = dict()
@@ -553,9 +747,14 @@ class HTCondorSubmitter(PluginBase):
             this_panda_queue_dict = dict()
 
         # get default information from queue info
-        n_core_per_node_from_queue = this_panda_queue_dict.get('corecount', 1) if this_panda_queue_dict.get('corecount', 1) else 1
-        is_unified_queue = this_panda_queue_dict.get('capability', '') == 'ucore'
-        pilot_version_orig = str(this_panda_queue_dict.get('pilot_version', ''))
+        if self.useAtlasAGIS:
+            n_core_per_node_from_queue = panda_queues_dict.get_corecount(self.queueName)
+            is_unified_queue = panda_queues_dict.get_capability(self.queueName) == 'ucore'
+            pilot_version_orig = panda_queues_dict.get_pilot_version(self.queueName)
+        else:
+            n_core_per_node_from_queue = 1
+            is_unified_queue = False
+            pilot_version_orig = ''
         pilot_version_suffix_str = '_pilot2' if pilot_version_orig == '2' else ''
 
         # get override requirements from queue configured
@@ -584,20 +783,12 @@ class HTCondorSubmitter(PluginBase):
         if self.useAtlasGridCE:
             # If ATLAS Grid CE mode used
             tmpLog.debug('Using ATLAS Grid CE mode...')
-            queues_from_queue_list = this_panda_queue_dict.get('queues', [])
             special_par = this_panda_queue_dict.get('special_par', '')
-            ce_auxilary_dict = {}
-            for _queue_dict in queues_from_queue_list:
-                if not ( _queue_dict.get('ce_endpoint')
-                        and str(_queue_dict.get('ce_state', '')).upper() == 'ACTIVE'
-                        and str(_queue_dict.get('ce_flavour', '')).lower() in set(['arc-ce', 'cream-ce', 'htcondor-ce']) ):
-                    continue
-                ce_endpoint = _queue_dict.get('ce_endpoint')
-                if ( ce_endpoint in ce_auxilary_dict
-                    and str(_queue_dict.get('ce_queue_name', '')).lower() == 'default' ):
-                    pass
-                else:
-                    ce_auxilary_dict[ce_endpoint] = _queue_dict
+            # active CEs pre-parsed by cacher
+            if self.useAtlasAGIS:
+                ce_auxilary_dict = panda_queues_dict.get_active_ces(self.queueName)
+            else:
+                ce_auxilary_dict = {}
             # qualified CEs from AGIS info
             n_qualified_ce = len(ce_auxilary_dict)
             if n_qualified_ce > 0:
@@ -621,6 +812,7 @@ class HTCondorSubmitter(PluginBase):
                                             method_name='_handle_one_worker')
             ce_info_dict = dict()
             batch_log_dict = dict()
+            template_file = getattr(self, 'templateFile', None)
             data = {'workspec': workspec,
                     'to_submit': to_submit,}
             if to_submit:
@@ -653,7 +845,7 @@ class HTCondorSubmitter(PluginBase):
                     if os.path.isdir(self.CEtemplateDir) and ce_flavour_str:
                         sdf_template_filename = '{ce_flavour_str}{pilot_version_suffix_str}.sdf'.format(
                                                     ce_flavour_str=ce_flavour_str, pilot_version_suffix_str=pilot_version_suffix_str)
-                        self.templateFile = os.path.join(self.CEtemplateDir, sdf_template_filename)
+                        template_file = os.path.join(self.CEtemplateDir, sdf_template_filename)
                 else:
                     try:
                         # Manually define site condor schedd as ceHostname and central manager as ceEndpoint
@@ -668,35 +860,16 @@ class HTCondorSubmitter(PluginBase):
                             ce_info_dict['ce_endpoint'] = self.ceEndpoint
                     except AttributeError:
                         pass
-                # template for batch script
-                try:
-                    tmpFile = open(self.templateFile)
-                    sdf_template_raw = tmpFile.read()
-                    tmpFile.close()
-                except AttributeError:
+                # template for batch script, pre-parsed and cached until the file is changed
+                if template_file is None:
                     tmpLog.error('No valid templateFile found. Maybe templateFile, CEtemplateDir invalid, or no valid CE found')
                     to_submit = False
                     return data
                 else:
-                    # get batch_log, stdout, stderr filename, and remobe commented liness
-                    sdf_template_str_list = []
-                    for _line in sdf_template_raw.split('\n'):
-                        if _line.startswith('#'):
-                            continue
-                        sdf_template_str_list.append(_line)
-                        _match_batch_log = re.match('log = (.+)', _line)
-                        _match_stdout = re.match('output = (.+)', _line)
-                        _match_stderr = re.match('error = (.+)', _line)
-                        if _match_batch_log:
-                            batch_log_value = _match_batch_log.group(1)
-                            continue
-                        if _match_stdout:
-                            stdout_value = _match_stdout.group(1)
-                            continue
-                        if _match_stderr:
-                            stderr_value = _match_stderr.group(1)
-                            continue
-                    sdf_template = '\n'.join(sdf_template_str_list)
+                    sdf_template = _get_sdf_template(template_file)
+                    batch_log_value = sdf_template.batch_log_value
+                    stdout_value = sdf_template.stdout_value
+                    stderr_value = sdf_template.stderr_value
                     # Choose from Condor schedd and central managers
                     condor_schedd, condor_pool = random.choice(schedd_pool_choice_list)
                     # set submissionHost
@@ -756,6 +929,7 @@ class HTCondorSubmitter(PluginBase):
                         'condor_pool': condor_pool,
                         'use_spool': self.useSpool,
                         'pilot_version': pilot_version_orig,
+                        'sdf_dump_mode': self.sdfDumpMode,
                         })
             return data
 
@@ -776,7 +950,8 @@ class HTCondorSubmitter(PluginBase):
         tmpLog.debug('{0} workers handled'.format(nWorkers))
 
         # submit
-        retValList = submit_bag_of_workers(list(dataIterator))
+        retValList = submit_bag_of_workers(list(dataIterator), n_threads=self.nScheddSubmitThreads,
+                                           timeout=self.scheddSubmitTimeout)
         tmpLog.debug('{0} workers submitted'.format(nWorkers))
 
         # propagate changed attributes
@@ -13,6 +13,9 @@ baseLogger = core_utils.setup_logger('k8s_submitter')
 
 # submitter for K8S
 class K8sSubmitter(PluginBase):
+    # instances are reused per thread to keep k8s client
+    isReusable = True
+
     # constructor
     def __init__(self, **kwarg):
         self.logBaseURL = None
@@ -11,6 +11,9 @@ baseLogger = core_utils.setup_logger('k8s_sweeper')
 
 # sweeper for K8S
 class K8sSweeper(BaseSweeper):
+    # instances are reused per thread since pod list is cached in the instance
+    isReusable = True
+
     # constructor
     def __init__(self, **kwarg):
         BaseSweeper.__init__(self, **kwarg)
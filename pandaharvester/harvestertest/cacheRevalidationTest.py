@@ -0,0 +1,26 @@
+import sys
+
+from pandaharvester.harvestercore.db_proxy_pool import DBProxyPool as DBProxy
+
+# check that data refreshed in this process is revalidated by probing lastUpdate instead of being reloaded
+
+mainKey = 'cacheRevalidationTest'
+proxy = DBProxy()
+
+# refresh
+if not proxy.refresh_cache(mainKey, None, {'test': True}):
+    print('ERROR: failed to refresh cache')
+    sys.exit(1)
+
+# get with ttl=0 to probe the database
+proxy.get_cache_stats(reset=True)
+cacheSpec = proxy.get_cache(mainKey, ttl=0)
+stats = proxy.get_cache_stats()
+print(stats)
+if cacheSpec is None or cacheSpec.data != {'test': True}:
+    print('ERROR: wrong data {0}'.format(cacheSpec))
+    sys.exit(1)
+if stats['revalidations'] != 1 or stats['refreshes'] != 0:
+    print('ERROR: local copy was not revalidated by the probe')
+    sys.exit(1)
+print('OK')
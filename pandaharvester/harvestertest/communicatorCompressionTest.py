@@ -0,0 +1,109 @@
+import sys
+import json
+import zlib
+import random
+import socket
+import time
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs
+
+from pandaharvester.harvesterconfig import harvester_config
+from pandaharvester.harvestercommunicator.panda_communicator import PandaCommunicator
+
+# number of bulk calls and jobs per call
+try:
+    nRequests = int(sys.argv[1])
+except Exception:
+    nRequests = 20
+try:
+    nJobs = int(sys.argv[2])
+except Exception:
+    nJobs = 100
+
+
+# mock PanDA server which decompresses requests and compresses responses when accepted
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        encoding = self.headers.get('Content-Encoding')
+        if encoding == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            body = zlib.decompress(body)
+        jobList = json.loads(parse_qs(body.decode('utf-8'))['jobList'][0])
+        retMaps = [{'content': json.dumps({'StatusCode': 0, 'command': 'NULL',
+                                           'PandaID': job['jobId']})} for job in jobList]
+        resBody = json.dumps([True, retMaps]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', '') and encoding is not None:
+            compObj = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            resBody = compObj.compress(resBody) + compObj.flush()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(resBody)))
+        self.end_headers()
+        self.wfile.write(resBody)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+server = MockServer(('127.0.0.1', 0), MockHandler)
+thr = threading.Thread(target=server.serve_forever)
+thr.daemon = True
+thr.start()
+harvester_config.pandacon.pandaURL = 'http://127.0.0.1:{0}/server/panda'.format(server.server_address[1])
+
+# job reports with job metrics and job report in metaData
+random.seed(0)
+dataList = []
+for i in range(nJobs):
+    metaData = {'files': {'output': [{'subFiles': [{'name': 'EVNT.{0:08d}._{1:06d}.pool.root.1'.format(i, j),
+                                                   'file_guid': '{0:032X}'.format(random.getrandbits(128)),
+                                                   'nentries': random.randint(1, 5000),
+                                                   'file_size': random.randint(1, 10 ** 9)}]}
+                                     for j in range(200)]},
+                'resource': {'executor': {'EVNTtoHITS': {'cpuTime': random.randint(1, 10 ** 5),
+                                                         'wallTime': random.randint(1, 10 ** 5)}}}}
+    dataList.append({'jobId': i, 'state': 'finished', 'attemptNr': 1, 'siteName': 'MOCK_SITE',
+                     'metaData': json.dumps(metaData)})
+data = {'jobList': json.dumps(dataList), 'harvester_id': 'mock'}
+print('{0} bulk calls with {1} jobs ; {2} bytes per call before encoding'.format(nRequests, nJobs,
+                                                                                len(data['jobList'])))
+
+for useCompression, compressionMethod in [(False, None), (True, 'gzip'), (True, 'deflate')]:
+    harvester_config.pandacon.useCompression = useCompression
+    harvester_config.pandacon.compressionMethod = compressionMethod
+    communicator = PandaCommunicator()
+    communicator.get_timing_stats(reset=True)
+    time_point = time.time()
+    for i in range(nRequests):
+        tmpStat, tmpRes = communicator.post('updateJobsInBulk', data)
+        assert tmpStat and len(tmpRes.json()[1]) == nJobs
+    time_consumed = time.time() - time_point
+    stats = communicator.get_timing_stats()['updateJobsInBulk']
+    print('useCompression={0} method={1} : {2:.3f} sec ; sent {3} bytes/call ; received {4} bytes/call ; '
+          'compression CPU {5:.1f} msec/call'.format(useCompression, compressionMethod, time_consumed,
+                                                    stats['bytesSent'] // nRequests,
+                                                    stats['bytesReceived'] // nRequests,
+                                                    stats['compressTime'] * 1000 / nRequests))
+
+server.shutdown()
@@ -0,0 +1,69 @@
+import sys
+import json
+import socket
+import time
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from pandaharvester.harvesterconfig import harvester_config
+from pandaharvester.harvestercommunicator.panda_communicator import PandaCommunicator
+
+# number of requests
+try:
+    nRequests = int(sys.argv[1])
+except Exception:
+    nRequests = 1000
+
+
+# mock PanDA server which returns the same response for any request
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        # disable Nagle to avoid delayed ACK with keep-alive
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({'StatusCode': 0}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+server = MockServer(('127.0.0.1', 0), MockHandler)
+thr = threading.Thread(target=server.serve_forever)
+thr.daemon = True
+thr.start()
+harvester_config.pandacon.pandaURL = 'http://127.0.0.1:{0}/server/panda'.format(server.server_address[1])
+
+for useSession in [False, True]:
+    harvester_config.pandacon.useSession = useSession
+    communicator = PandaCommunicator()
+    communicator.get_timing_stats(reset=True)
+    time_point = time.time()
+    for i in range(nRequests):
+        communicator.post('isAlive', {'i': i})
+    time_consumed = time.time() - time_point
+    print('useSession={0} : {1} requests in {2:.3f} sec ; Avg: {3:.1f} req/sec'.format(useSession, nRequests,
+                                                                                      time_consumed,
+                                                                                      nRequests / time_consumed))
+    print(communicator.get_timing_stats())
+
+server.shutdown()
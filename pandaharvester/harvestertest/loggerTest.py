@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import inspect
+import logging
+import tempfile
+
+from pandalogger.LogWrapper import LogWrapper
+from pandaharvester.harvestercore import core_utils
+
+# number of workers
+try:
+    nWorkers = int(sys.argv[1])
+except Exception:
+    nWorkers = 10000
+
+# logger writing to a temporary file
+logDir = tempfile.mkdtemp()
+_logger = logging.getLogger('panda.log.loggerTest')
+_logger.propagate = False
+_logger.setLevel(logging.DEBUG)
+handler = logging.FileHandler(os.path.join(logDir, 'loggerTest.log'))
+handler.setFormatter(logging.Formatter('%(asctime)s %(name)s: %(levelname)s %(message)s'))
+_logger.addHandler(handler)
+
+
+# make logger with inspect as done before
+def make_logger_inspect(tmp_log, token=None):
+    tmpStr = inspect.stack()[1][3]
+    tmpStr += ' <{0}>'.format(token)
+    return LogWrapper(tmp_log, tmpStr)
+
+
+# loop like check_workers in monitor
+def check_workers(func, lazy):
+    for workerID in range(nWorkers):
+        tmpLog = func(_logger, token='workerID={0}'.format(workerID))
+        if lazy:
+            tmpLog.debug('status={0} subStatus={1}', 'running', None)
+            tmpLog.debug('got {0} files to stage out', 0)
+        else:
+            tmpLog.debug('status={0} subStatus={1}'.format('running', None))
+            tmpLog.debug('got {0} files to stage out'.format(0))
+        tmpLog.info('done')
+
+
+for useQueue in [False, True]:
+    if useQueue:
+        core_utils.enable_queue_logging()
+    for level in [logging.DEBUG, logging.INFO]:
+        _logger.setLevel(level)
+        for label, func, lazy in [('inspect', make_logger_inspect, False), ('frame', core_utils.make_logger, True)]:
+            if useQueue and label == 'inspect':
+                continue
+            time_point = time.time()
+            check_workers(func, lazy)
+            time_consumed = time.time() - time_point
+            print('queue={0} level={1} {2:7s} : {3} workers in {4:.3f} sec ; Avg: {5:.1f} workers/sec'.format(
+                useQueue, logging.getLevelName(level), label, nWorkers, time_consumed, nWorkers / time_consumed))
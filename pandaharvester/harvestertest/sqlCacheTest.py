@@ -0,0 +1,61 @@
+import re
+import sys
+import time
+
+from pandaharvester.harvesterconfig import harvester_config
+from pandaharvester.harvestercore import db_proxy
+
+# number of rows
+try:
+    nRows = int(sys.argv[1])
+except Exception:
+    nRows = 5000
+
+sql = "UPDATE work_table SET status=:status,modificationTime=:timeNow,errorCode=:errorCode "
+sql += "WHERE workerID=:workerID AND status IN (:st1,:st2) "
+varMapList = []
+for i in range(nRows):
+    varMapList.append({':status': 'running', ':timeNow': None, ':errorCode': 0, ':workerID': i,
+                       ':st1': 'submitted', ':st2': 'idle'})
+
+
+# conversion without cache as done before
+def convert_params_nocache(sql, varmap):
+    re.search('^INSERT', sql, re.I)
+    re.search('^UPDATE', sql, re.I)
+    re.search(' FOR UPDATE', sql, re.I)
+    re.search('^DELETE', sql, re.I)
+    if harvester_config.db.engine == 'sqlite':
+        sql = re.sub(' FOR UPDATE', ' ', sql, re.I)
+        sql = re.sub('INSERT IGNORE', 'INSERT OR IGNORE', sql, re.I)
+    else:
+        sql = re.sub('INSERT OR IGNORE', 'INSERT IGNORE', sql, re.I)
+    paramList = []
+    items = re.findall(':[^ $,)]+', sql)
+    for item in items:
+        paramList.append(varmap[item])
+    if harvester_config.db.engine == 'mariadb':
+        sql = re.sub(':[^ $,)]+', '%s', sql)
+    return sql, paramList
+
+
+# conversion with cache
+def convert_params_cache(sql, varmap):
+    needLock, newSQL, items = db_proxy.compile_sql(sql)
+    return newSQL, db_proxy.bind_params(items, varmap)
+
+
+for engine in ['sqlite', 'mariadb']:
+    harvester_config.db.engine = engine
+    for label, func in [('nocache', convert_params_nocache), ('cache', convert_params_cache)]:
+        time_point = time.time()
+        retList = [func(sql, varMap) for varMap in varMapList]
+        time_consumed = time.time() - time_point
+        print('engine={0} {1:7s} : {2} rows in {3:.3f} sec ; Avg: {4:.1f} rows/sec'.format(engine, label, nRows,
+                                                                                            time_consumed,
+                                                                                            nRows / time_consumed))
+    # check consistency
+    for varMap in varMapList[:10]:
+        oldSQL, oldParams = convert_params_nocache(sql, varMap)
+        newSQL, newParams = convert_params_cache(sql, varMap)
+        assert oldSQL == newSQL and list(oldParams) == list(newParams)